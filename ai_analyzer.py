@@ -9,6 +9,7 @@ Architecture:
 - LLMProvider Protocol: Structural typing interface for all AI providers
 - AzureOpenAIProvider: Concrete implementation for Azure OpenAI
 - AIProviderFactory: Factory pattern for provider instantiation
+- llm_cache: Persistent response cache shared by provider calls (see llm_cache.py)
 
 Provider Abstraction Pattern:
 The Protocol-based design allows dependency injection without inheritance.
@@ -41,6 +42,8 @@ except ImportError:
     from typing_extensions import Protocol, runtime_checkable
 
 from openai import AzureOpenAI, APIError, RateLimitError, APITimeoutError
+from llm_cache import llm_cache, llm_cache_key
+from resource_registry import credential_key, registry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -330,7 +333,8 @@ class AzureOpenAIProvider:
         endpoint: str,
         api_version: str = "2024-02-15-preview",
         model: str = "gpt-4o",
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        cache=None
     ):
         """
         Initialize Azure OpenAI provider.
@@ -341,17 +345,64 @@ class AzureOpenAIProvider:
             api_version: API version (default: 2024-02-15-preview)
             model: Model deployment name (default: gpt-4o)
             temperature: Temperature setting (default: 0.0 for deterministic)
+            cache: LLMCache for responses (default: shared llm_cache)
         """
         self.model = model
         self.temperature = temperature
-        self.client = AzureOpenAI(
-            api_key=api_key,
-            azure_endpoint=endpoint,
-            api_version=api_version,
-            timeout=60.0,  # 60 second timeout
-            max_retries=2   # Retry transient failures up to 2 times
+        self.cache = llm_cache if cache is None else cache
+        # Client (and its connection pool) is shared by warm invocations with the same credentials
+        self.client = registry.get(
+            "azure_openai",
+            credential_key(api_key, endpoint, api_version),
+            lambda: AzureOpenAI(
+                api_key=api_key,
+                azure_endpoint=endpoint,
+                api_version=api_version,
+                timeout=60.0,  # 60 second timeout
+                max_retries=2   # Retry transient failures up to 2 times
+            ),
+            close=lambda client: client.close()
         )
 
+    def _complete(self, system_prompt: str, user_prompt: str, max_tokens: Optional[int] = None, **options):
+        """
+        Chat completion content and token usage.
+
+        Prompts answered before are served from the response cache without calling the API,
+        usage is {'cached': True} then. Only deterministic calls (temperature 0) are cached,
+        with a higher temperature every call samples a new answer.
+        """
+        key = None
+        if float(self.temperature) == 0:
+            key = llm_cache_key(self.model, self.temperature, system_prompt, user_prompt, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached, {'cached': True}
+
+        if max_tokens is not None:
+            options['max_tokens'] = max_tokens
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=self.temperature,
+            **options
+        )
+        if not response or not response.choices:
+            return None, {}
+
+        content = response.choices[0].message.content
+        usage = {
+            'prompt_tokens': getattr(response.usage, 'prompt_tokens', 0) or 0,
+            'completion_tokens': getattr(response.usage, 'completion_tokens', 0) or 0,
+            'total_tokens': getattr(response.usage, 'total_tokens', 0) or 0
+        }
+        if key and content and content.strip():
+            self.cache.put(key, content, usage['total_tokens'])
+        return content, usage
+
     def _get_system_prompt(self, section_type: str) -> str:
         """
         Generate system prompt for specific analysis section type.
@@ -514,22 +565,15 @@ SLA THRESHOLDS:
             logger.info(f"[AIAnalyzer] Generating section: {section_type}")
 
             # Call Azure OpenAI
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
+            content, usage = self._complete(
+                system_prompt,
+                user_prompt,
                 max_tokens=1500,  # ~1000 words per section
             )
 
-            # Extract content
-            content = response.choices[0].message.content
-
             # Log token usage
-            tokens_used = response.usage.total_tokens
-            logger.info(f"[AIAnalyzer] Section {section_type} generated: {len(content)} chars, {tokens_used} tokens")
+            tokens_used = 'cached' if usage.get('cached') else f"{usage.get('total_tokens', 0)} tokens"
+            logger.info(f"[AIAnalyzer] Section {section_type} generated: {len(content)} chars, {tokens_used}")
 
             return content
 
@@ -856,19 +900,11 @@ OVERALL METRICS:
             logger.info(f"[AIAnalyzer] User prompt ({len(user_prompt)} chars):")
             logger.info(f"[AIAnalyzer] {user_prompt}")  # Full user prompt
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                temperature=self.temperature,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-            )
-
-            content = response.choices[0].message.content.strip()
-            tokens = response.usage.total_tokens if response.usage else 0
+            content, usage = self._complete(system_prompt, user_prompt)
+            content = content.strip()
+            tokens = 'cached' if usage.get('cached') else f"{usage.get('total_tokens', 0)} tokens"
 
-            logger.info(f"[AIAnalyzer] Analysis generated: {len(content)} chars, {tokens} tokens")
+            logger.info(f"[AIAnalyzer] Analysis generated: {len(content)} chars, {tokens}")
 
             return content
 
@@ -963,35 +999,33 @@ OVERALL METRICS:
 
             # Call Azure OpenAI API
             logger.info(f"[AIAnalyzer] Generating trend analysis for {len(builds_comparison_data)} test runs")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": TREND_SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
+            content, usage = self._complete(
+                TREND_SYSTEM_PROMPT,
+                user_prompt,
                 max_tokens=TREND_MAX_TOKENS,
                 timeout=60.0
             )
 
             # Validate response
-            if not response or not response.choices:
+            if content is None and not usage:
                 logger.warning("[AIAnalyzer] Trend analysis: empty response from API")
                 return None
 
-            content = response.choices[0].message.content
             if not content or not content.strip():
                 logger.warning("[AIAnalyzer] Trend analysis: empty content in response")
                 return None
 
             # Log success with token usage
-            prompt_tokens = getattr(response.usage, 'prompt_tokens', 0) if hasattr(response, 'usage') else 0
-            completion_tokens = getattr(response.usage, 'completion_tokens', 0) if hasattr(response, 'usage') else 0
-            logger.info(
-                f"[AIAnalyzer] Trend analysis generated: "
-                f"{prompt_tokens} prompt + {completion_tokens} completion = "
-                f"{prompt_tokens + completion_tokens} total tokens"
-            )
+            if usage.get('cached'):
+                logger.info("[AIAnalyzer] Trend analysis served from response cache")
+            else:
+                prompt_tokens = usage['prompt_tokens']
+                completion_tokens = usage['completion_tokens']
+                logger.info(
+                    f"[AIAnalyzer] Trend analysis generated: "
+                    f"{prompt_tokens} prompt + {completion_tokens} completion = "
+                    f"{prompt_tokens + completion_tokens} total tokens"
+                )
 
             return content.strip()
 
@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import requests
+from os import environ
+from galloper_client import get_galloper_client
 from data_manager import DataManager
 from report_builder import ReportBuilder
 from email_notifications import Email
@@ -30,6 +32,26 @@ STATUS_COLOR = {
     "finished": GRAY
 }
 
+# number of Influx/Galloper fetches of the prefetch stage running concurrently, 1 - serial
+PREFETCH_WORKERS = int(environ.get("PREFETCH_WORKERS", 4))
+
+
+class ApiReportContext:
+    """
+    Everything the report builder needs for one API report, populated by the prefetch stage.
+    """
+
+    def __init__(self):
+        self.tests_data = []
+        self.last_test_data = []
+        self.baseline = None
+        self.violation = 0
+        self.thresholds = []
+        self.report_data = None
+        self.api_reports = None
+        self.baseline_report_id = None
+        self.baseline_report_fetched = False
+
 
 class ApiEmailNotification:
     """
@@ -78,32 +100,31 @@ class ApiEmailNotification:
         Returns:
             Email: Email object containing subject, body, recipients, and charts
         """
-        # Fetch test data, baseline, and threshold violations
-        tests_data, last_test_data, baseline, violation, compare_with_thresholds = \
-            self.data_manager.get_api_test_info()
-
-        # Fetch report data for start_time and end_time
-        report_data = self._get_report_data()
+        # Fetch test data, baseline, thresholds and report data concurrently
+        context = self.prefetch()
+        report_data = context.report_data
 
         # Generate email body with charts
         email_body, charts, date = self.report_builder.create_api_email_body(
             self.args, 
-            tests_data, 
-            last_test_data,
-            baseline,
+            context.tests_data, 
+            context.last_test_data,
+            context.baseline,
             self.args['comparison_metric'],
-            violation, 
-            compare_with_thresholds,
-            report_data
+            context.violation, 
+            context.thresholds,
+            report_data,
+            context=context
         )
 
         test_description = self.report_builder.create_test_description(
             self.args,
-            last_test_data,
-            baseline,
+            context.last_test_data,
+            context.baseline,
             self.args['comparison_metric'],
-            violation,
-            report_data
+            context.violation,
+            report_data,
+            context=context
         )
 
         # Create email subject
@@ -119,6 +140,52 @@ class ApiEmailNotification:
             date
         )
 
+    def prefetch(self):
+        """
+        Prefetch stage: run the independent Influx and Galloper fetches concurrently.
+
+        Builds history, baseline, thresholds and report data only need the test parameters, so they
+        start together. Once the builds and the baseline are known, API reports of the builds and the
+        baseline report id are fetched while thresholds and baseline comparison are evaluated.
+
+        Returns:
+            ApiReportContext: fully populated context for the report builder
+        """
+        context = ApiReportContext()
+        with ThreadPoolExecutor(max_workers=max(PREFETCH_WORKERS, 1)) as pool:
+            builds_future = pool.submit(self.data_manager.get_last_builds)
+            baseline_future = pool.submit(self.data_manager.get_baseline)
+            thresholds_future = pool.submit(self.data_manager.fetch_thresholds)
+            report_future = pool.submit(self._get_report_data)
+
+            context.tests_data = builds_future.result()
+            if len(context.tests_data) == 0:
+                raise Exception("No data found for given parameters")
+            self.args['build_id'] = context.tests_data[0][0]['build_id']
+            build_ids = [test[0].get('build_id') for test in context.tests_data if test and test[0].get('build_id')]
+            reports_future = pool.submit(self.report_builder.fetch_api_reports_for_comparison, self.args, build_ids)
+
+            context.baseline = baseline_future.result()
+            baseline_future = None
+            if context.baseline and context.baseline[0].get("build_id"):
+                baseline_future = pool.submit(self.report_builder._get_baseline_api_report_id,
+                                              self.args, context.baseline[0]["build_id"])
+
+            try:
+                thresholds_future.result()
+            except Exception as e:
+                # evaluated below with the same fallbacks as without prefetch
+                print(f"Failed to prefetch thresholds: {e}")
+            context.last_test_data, context.baseline, context.violation, context.thresholds = \
+                self.data_manager.evaluate_api_test(context.tests_data, context.baseline)[1:]
+
+            context.report_data = report_future.result()
+            context.api_reports = reports_future.result()
+            if baseline_future is not None:
+                context.baseline_report_id = baseline_future.result()
+                context.baseline_report_fetched = True
+        return context
+
     def _create_email_subject(self, test_description, report_data, date):
         """
         Create formatted email subject line.
@@ -156,12 +223,11 @@ class ApiEmailNotification:
         Returns:
             dict: Report data containing start_time and end_time, or None if request fails
         """
-        headers = {'Authorization': f'bearer {self.args["token"]}'} if self.args.get("token") else {}
-        report_url = f"{self.args['galloper_url']}/api/v1/backend_performance/reports/{self.args['project_id']}?"
+        report_url = f"/api/v1/backend_performance/reports/{self.args['project_id']}?"
         report_url += f"name={self.args['test']}&limit=1"
         
         try:
-            response = requests.get(report_url, headers={**headers, 'Content-type': 'application/json'})
+            response = get_galloper_client(self.args['galloper_url'], self.args.get('token')).get(report_url)
             response.raise_for_status()
             data = response.json()
             
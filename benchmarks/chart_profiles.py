@@ -0,0 +1,73 @@
+"""
+Size and latency report of chart_generator rendering profiles per chart type.
+
+Renders every chart type used in the emails with each profile of chart_generator.RENDER_PROFILES
+(bypassing the chart cache) and prints PNG size, pixel size and render time, so a profile can be
+picked per project with the 'chart_profile' event parameter.
+
+Usage (from the repository root):
+    python benchmarks/chart_profiles.py [--profiles classic email ...] [--requests N] [--repeat N]
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chart_generator  # noqa: E402
+from report_builder import ReportBuilder  # noqa: E402
+from ui_email_notification import UIEmailNotification  # noqa: E402
+
+
+def chart_specs(requests_count):
+    builds = [{"date": f"{index:02d}-Jan", "error_rate": index % 7, "throughput": 50 + index,
+               "response_time": round(0.4 + index / 100, 2)} for index in range(1, 11)]
+    ui_builds = [{"date": f"{index:02d}-Jan", "ttfb": 0.2, "tbt": 0.1 * index, "lcp": 1.5 + index / 10,
+                  "cls": 0.01 * index, "inp": 0.2} for index in range(1, 11)]
+    half = requests_count // 2
+    bars = {"green_keys": list(range(1, half + 1)), "green_request": [round(0.2 + i / 10, 2) for i in range(half)],
+            "green_request_name": [f"request_{i}" for i in range(half)],
+            "red_keys": list(range(half + 1, requests_count + 1)),
+            "red_request": [-round(1 + i / 3, 2) for i in range(requests_count - half)],
+            "red_request_name": [f"slow_request_{i}" for i in range(requests_count - half)],
+            "yellow_keys": [], "yellow_request": [], "yellow_request_name": [],
+            "utility_keys": [], "utility_request": [], "utility_request_name": [], "width": 8, "height": 4.5}
+    comparison = {"keys": list(range(1, 11)), "latency_values": [1] * 10, "transfer_values": [0.5] * 10,
+                  "tbt_values": [0.3] * 10, "ttl_values": [0.2] * 10, "x_axis": "Test Runs",
+                  "y_axis": "Time, sec", "title": "", "width": 10, "height": 3}
+    return [("alerts_linechart", ReportBuilder.throughput_chart_spec(builds)[1]),
+            ("barchart", bars),
+            ("ui_comparison_linechart", comparison),
+            ("ui_metrics_chart_pages", UIEmailNotification.ui_metrics_chart_pages_spec(ui_builds)[1])]
+
+
+def png_size(data):
+    width, height = struct.unpack(">II", data[16:24])
+    return f"{width}x{height}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="*", default=list(chart_generator.RENDER_PROFILES))
+    parser.add_argument("--requests", type=int, default=20, help="bars in the bar chart")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    specs = chart_specs(args.requests)
+    chart_generator.alerts_linechart(specs[0][1])  # warm up matplotlib import and fonts cache
+    print(f"{'chart':<26}{'profile':<10}{'size, KB':>10}{'pixels':>12}{'time, ms':>10}")
+    for chart, datapoints in specs:
+        for profile in args.profiles:
+            render = getattr(chart_generator, chart)
+            started = time.time()
+            for _ in range(args.repeat):
+                data = render(dict(datapoints, profile=profile))
+            elapsed = (time.time() - started) / args.repeat * 1000
+            print(f"{chart:<26}{profile:<10}{len(data) / 1024:>10.1f}{png_size(data):>12}{elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark of chart rendering in ReportBuilder.create_charts and UIEmailNotification.
+
+Renders the three API trend charts and the two UI metric charts for synthetic build histories
+serially and with the chart_renderer process pool, and reports wall-clock time per mode.
+The chart cache is disabled, so every pass renders all the charts.
+
+Usage (from the repository root):
+    python benchmarks/chart_rendering.py [--builds N] [--repeat N] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import chart_renderer  # noqa: E402
+from chart_cache import ChartCache  # noqa: E402
+from report_builder import ReportBuilder  # noqa: E402
+from ui_email_notification import UIEmailNotification  # noqa: E402
+
+
+def chart_specs(builds_count):
+    builds = [{"date": f"{index:02d}-Jan", "error_rate": index % 7, "throughput": 50 + index,
+               "response_time": round(0.4 + index / 100, 2)} for index in range(1, builds_count + 1)]
+    ui_builds = [{"date": f"{index:02d}-Jan", "ttfb": 0.2, "tbt": 0.1 * index, "lcp": 1.5 + index / 10,
+                  "cls": 0.01 * index, "inp": 0.2} for index in range(1, builds_count + 1)]
+    specs = [ReportBuilder.success_rate_chart_spec(builds), ReportBuilder.throughput_chart_spec(builds),
+             ReportBuilder.response_time_chart_spec(builds),
+             UIEmailNotification.ui_metrics_chart_pages_spec(ui_builds),
+             UIEmailNotification.ui_metrics_chart_actions_spec(ui_builds)]
+    return [(chart, datapoints) for chart, datapoints, _ in specs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--builds", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    # repeated passes would otherwise be served from the chart cache
+    chart_renderer.chart_cache = ChartCache(size=0, directory="")
+    specs = chart_specs(args.builds)
+    chart_renderer.render_serial(specs[:1])  # warm up fonts cache
+    print(f"{'mode':<10}{'charts':>8}{'time, s':>10}")
+    for mode in ["serial", "process"]:
+        started = time.time()
+        for _ in range(args.repeat):
+            chart_renderer.render_charts(specs, mode=mode, workers=args.workers or None)
+        elapsed = (time.time() - started) / args.repeat
+        print(f"{mode:<10}{len(specs):>8}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Cold-start benchmark of the Lambda entry point.
+
+For the entry point alone and for the api and ui notification paths, runs a fresh interpreter with
+`python -X importtime` and reports the total import time, the wall-clock time of the process and
+the packages that take most of it. With --api-event / --ui-event (JSON files with real lambda events) it also
+calls lambda_handler in a fresh interpreter twice and reports cold and warm handler latency.
+
+Usage (from the repository root):
+    python benchmarks/cold_start.py [--top N] [--repeat N] [--api-event api.json] [--ui-event ui.json]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PATHS = {
+    "entry": "import lambda_function",
+    "api": "import lambda_function, api_email_notification",
+    "ui": "import lambda_function, ui_email_notification",
+}
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+HANDLER = """
+import json, sys, time
+from lambda_function import lambda_handler
+event = json.load(open(sys.argv[1]))
+for _ in range(2):
+    started = time.perf_counter()
+    status = lambda_handler(event, None)["statusCode"]
+    print("latency", status, time.perf_counter() - started)
+"""
+
+
+def import_times(code):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    modules = []
+    for self_us, cumulative_us, indent, name in IMPORTTIME.findall(result.stderr):
+        modules.append((name, int(self_us), int(cumulative_us), len(indent) == 1))
+    total = sum(cumulative for _, _, cumulative, top_level in modules if top_level)
+    return wall, total, modules
+
+
+def handler_latency(event_path):
+    result = subprocess.run([sys.executable, "-c", HANDLER, os.path.abspath(event_path)], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    lines = [line.split()[1:] for line in result.stdout.splitlines() if line.startswith("latency ")]
+    (cold_status, cold), (warm_status, warm) = lines
+    return cold_status, float(cold), warm_status, float(warm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--api-event")
+    parser.add_argument("--ui-event")
+    args = parser.parse_args()
+
+    print(f"{'path':<8}{'process, s':>12}{'imports, s':>12}  heaviest packages (self time of their modules, s)")
+    for path, code in PATHS.items():
+        runs = [import_times(code) for _ in range(args.repeat)]
+        wall = statistics.median(run[0] for run in runs)
+        total = statistics.median(run[1] for run in runs)
+        packages = {}
+        for name, self_us, _, _ in runs[-1][2]:
+            packages[name.split(".")[0]] = packages.get(name.split(".")[0], 0) + self_us
+        heaviest = sorted(packages.items(), key=lambda package: -package[1])[:args.top]
+        heaviest = ", ".join(f"{name} {self_us / 1e6:.3f}" for name, self_us in heaviest)
+        print(f"{path:<8}{wall:>12.3f}{total / 1e6:>12.3f}  {heaviest}")
+
+    for path, event in (("api", args.api_event), ("ui", args.ui_event)):
+        if not event:
+            print(f"{path:<8} handler latency skipped, pass --{path}-event with a lambda event")
+            continue
+        cold_status, cold, warm_status, warm = handler_latency(event)
+        print(f"{path:<8} handler cold {cold:.3f} s ({cold_status}), warm {warm:.3f} s ({warm_status})")
+
+
+if __name__ == "__main__":
+    main()
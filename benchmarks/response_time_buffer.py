@@ -0,0 +1,116 @@
+"""
+Benchmark of response time accumulation in DataManager.write_comparison_data_to_influx.
+
+Compares the previous np.append based accumulation with the preallocated typed buffer
+(DataManager.fill_response_times) on synthetic Influx shards. Every scenario runs in its own
+process, so peak RSS is reported per scenario.
+
+Usage (from the repository root):
+    python benchmarks/response_time_buffer.py [samples ...] [--batch-size N] [--requests N]
+"""
+
+import argparse
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+STRATEGIES = ["source_only", "np_append", "preallocated"]
+
+
+class ShardClient(object):
+    """Influx client stand-in returning synthetic response_time shards in the raw Influx format."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.remaining = 0
+        self.random = np.random.RandomState(1)
+
+    def query(self, query):
+        from influxdb.resultset import ResultSet
+        size = min(self.batch_size, self.remaining)
+        self.remaining -= size
+        values = self.random.randint(10, 5000, size=size).tolist()
+        rows = [[str(index), value] for index, value in enumerate(values, 1)]
+        return ResultSet({"series": [{"name": "test", "columns": ["time", "response_time"], "values": rows}]})
+
+
+def _source(client, total, batch_size):
+    client.remaining = total
+    for _ in range(0, total, batch_size):
+        yield client.query(None)
+
+
+def run(strategy, samples, batch_size, requests_count):
+    import data_manager
+    data_manager.BATCH_SIZE = batch_size
+    client = ShardClient(batch_size)
+    per_request = samples // requests_count
+    started = time.time()
+
+    if strategy == "source_only":
+        for _ in range(requests_count):
+            for result in _source(client, per_request, batch_size):
+                list(result.get_points())
+    elif strategy == "np_append":
+        data = np.array([])
+        for _ in range(requests_count):
+            times = np.array([])
+            for result in _source(client, per_request, batch_size):
+                times = np.append(times, list(int(each["response_time"]) for each in result.get_points()))
+            data = np.append(data, times)
+            [int(np.percentile(times, pct)) for pct in data_manager.PERCENTILES]
+        [int(np.percentile(data, pct)) for pct in data_manager.PERCENTILES]
+    else:
+        manager = data_manager.DataManager({"influx_host": "localhost", "influx_port": 8086, "influx_user": "",
+                                            "influx_password": "", "simulation": "test", "build_id": "build"},
+                                           None, None, None, logging.getLogger("benchmark"))
+        manager.client = client
+        data = np.empty(per_request * requests_count, dtype=data_manager.RESPONSE_TIME_DTYPE)
+        for index in range(requests_count):
+            req = {"request_name": "req", "method": "GET", "total": per_request}
+            times = data[index * per_request:(index + 1) * per_request]
+            client.remaining = per_request
+            manager.fill_response_times(req, times)
+            np.percentile(times, data_manager.PERCENTILES)
+        np.percentile(data, data_manager.PERCENTILES)
+
+    elapsed = time.time() - started
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{strategy},{samples},{elapsed:.2f},{peak_rss_mb:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("samples", nargs="*", type=int, default=[1000000, 10000000, 50000000])
+    parser.add_argument("--batch-size", type=int, default=1000000)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--strategies", nargs="*", default=STRATEGIES)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run, args.samples[0], args.batch_size, args.requests)
+        return
+
+    print(f"{'strategy':<14}{'samples':>12}{'time, s':>10}{'peak RSS, MB':>14}")
+    for samples in args.samples:
+        for strategy in args.strategies:
+            proc = subprocess.run([sys.executable, __file__, str(samples), "--run", strategy,
+                                   "--batch-size", str(args.batch_size), "--requests", str(args.requests)],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{strategy:<14}{samples:>12}{'failed':>10}  {proc.stderr.strip().splitlines()[-1:]}")
+                continue
+            name, _, elapsed, rss = proc.stdout.strip().splitlines()[-1].split(",")
+            print(f"{name:<14}{samples:>12}{elapsed:>10}{rss:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Copyright 2019 getcarrier.io
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from os import environ
+
+
+# in-process LRU tier size in charts, 0 - disabled
+CHART_CACHE_SIZE = int(environ.get("CHART_CACHE_SIZE", 64))
+# on-disk tier directory, not set - disabled
+CHART_CACHE_DIR = environ.get("CHART_CACHE_DIR")
+CHART_CACHE_DIR_MAX_BYTES = int(environ.get("CHART_CACHE_DIR_MAX_BYTES", 50 * 1024 * 1024))
+
+
+def chart_key(chart, datapoints, backend):
+    """Content address of a chart: hash of the chart type, backend and datapoints."""
+    payload = json.dumps({"chart": chart, "backend": backend, "datapoints": datapoints},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChartCache(object):
+    """
+    Rendered charts by content address: an in-process LRU tier in front of an optional on-disk tier.
+
+    The on-disk tier keeps one file per chart and evicts least recently used files once the
+    directory grows over `max_bytes`.
+    """
+
+    def __init__(self, size=None, directory=None, max_bytes=None):
+        self.size = CHART_CACHE_SIZE if size is None else size
+        self.directory = CHART_CACHE_DIR if directory is None else directory
+        self.max_bytes = max_bytes or CHART_CACHE_DIR_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return bool(self.size or self.directory)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        data = self._read(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+        self._write(key, data)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.misses = 0
+
+    def _remember(self, key, data):
+        if not self.size:
+            return
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.chart")
+
+    def _read(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))
+            return data
+        except OSError:
+            return None
+
+    def _write(self, key, data):
+        if not self.directory or len(data) > self.max_bytes:
+            return
+        try:
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._evict()
+        except OSError as e:
+            print(f"[CHARTS] Could not write chart cache: {e}")
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".chart"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+
+chart_cache = ChartCache()
@@ -1,15 +1,80 @@
 # Copyright 2019 getcarrier.io
 # Licensed under the Apache License, Version 2.0
 
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.ticker import ScalarFormatter
+from io import BytesIO
+from os import environ
 
-plt.rcParams.update({'font.size': 14})
+# matplotlib is imported on first use, it is the most expensive import of a cold start
+plt = None
 
 YELLOW = '#FFA400'
 
+# Rendering profiles:
+#   dpi_scale - multiplier of the chart's own dpi, max_width_px - dpi is lowered so the figure is not wider,
+#   compress_level - PNG zlib level 0-9, colors - quantize to a palette of this size.
+# compress_level and colors re-encode the PNG with Pillow (requirements.txt), skipped with a warning without it.
+RENDER_PROFILES = {
+    "classic": {"dpi_scale": 1, "max_width_px": None, "compress_level": None, "colors": None},
+    "email": {"dpi_scale": 1, "max_width_px": 1000, "compress_level": 9, "colors": 64},
+    "retina": {"dpi_scale": 2, "max_width_px": 2000, "compress_level": 9, "colors": None},
+    "archive": {"dpi_scale": 1, "max_width_px": None, "compress_level": 9, "colors": None},
+}
+CHART_PROFILE = environ.get("CHART_PROFILE", "classic")
+
+
+def _load_pyplot():
+    global plt
+    if plt is None:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as pyplot
+        pyplot.rcParams.update({'font.size': 14})
+        plt = pyplot
+    return plt
+
+
+def render_profile(datapoints):
+    name = datapoints.get('profile') or CHART_PROFILE
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown chart profile: {name}. Must be one of {', '.join(RENDER_PROFILES)}")
+    return RENDER_PROFILES[name]
+
+
+def _subplots(datapoints, width, height, dpi):
+    """Figure of width x height inches, dpi adjusted by the rendering profile of the datapoints."""
+    profile = render_profile(datapoints)
+    dpi = dpi * profile['dpi_scale']
+    if profile['max_width_px'] and width * dpi > profile['max_width_px']:
+        dpi = profile['max_width_px'] / width
+    return plt.subplots(figsize=(width, height), dpi=dpi, facecolor='w')
+
+
+def _to_png(fig, datapoints=None):
+    """Render the figure into an in-memory PNG and release it."""
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    plt.close(fig)
+    data = buffer.getvalue()
+    profile = render_profile(datapoints or {})
+    if profile['compress_level'] is None and not profile['colors']:
+        return data
+    return _reencode_png(data, profile['compress_level'], profile['colors'])
+
+
+def _reencode_png(data, compress_level=None, colors=None):
+    try:
+        from PIL import Image
+    except ImportError:
+        print("[CHARTS] Pillow is not installed, PNG is not re-encoded for the rendering profile")
+        return data
+    image = Image.open(BytesIO(data)).convert('RGB')
+    if colors:
+        image = image.quantize(colors=colors)
+    buffer = BytesIO()
+    image.save(buffer, format='PNG', optimize=True,
+               compress_level=6 if compress_level is None else compress_level)
+    return buffer.getvalue()
+
 
 def _setup_chart_style(ax, x_max, y_max, datapoints):
     """Configure common chart styling."""
@@ -36,8 +101,8 @@ def _annotate_values(ax, values, x_coords, y_offset_pct=0.05):
 
 def alerts_linechart(datapoints):
     """Generate alert trends line chart."""
-    fig, ax = plt.subplots(figsize=(datapoints['width'], datapoints['height'] * 1.5), 
-                          dpi=72, facecolor='w')
+    _load_pyplot()
+    fig, ax = _subplots(datapoints, datapoints['width'], datapoints['height'] * 1.5, 72)
     
     x_max = max(datapoints['values'])
     y_max = max(datapoints['keys'])
@@ -49,14 +114,13 @@ def alerts_linechart(datapoints):
     _annotate_values(ax, datapoints['keys'], datapoints['values'])
     _setup_chart_style(ax, x_max, y_max, datapoints)
     
-    fig.savefig(datapoints['path_to_save'], bbox_inches='tight')
-    plt.close()
+    return _to_png(fig, datapoints)
 
 
 def barchart(datapoints):
     """Generate comparison bar chart with positive/negative values."""
-    fig, ax = plt.subplots(figsize=(datapoints['width'] * 2, datapoints['height'] * 2), 
-                          dpi=300, facecolor='w')
+    _load_pyplot()
+    fig, ax = _subplots(datapoints, datapoints['width'] * 2, datapoints['height'] * 2, 300)
     
     bar_configs = [
         (datapoints['utility_keys'], datapoints['utility_request'], 'white', None, None),
@@ -85,6 +149,7 @@ def barchart(datapoints):
                               rotation=90, verticalalignment='bottom')
     
     plt.yscale('symlog', base=2, linthresh=5.0)
+    from matplotlib.ticker import ScalarFormatter
     ax.get_yaxis().set_major_formatter(ScalarFormatter())
     ax.set_frame_on(False)
     ax.axhline(linewidth=1, color='black')
@@ -93,14 +158,13 @@ def barchart(datapoints):
     ax.set_yticklabels([])
     ax.set_yticks([])
     
-    fig.savefig(datapoints['path_to_save'], bbox_inches='tight')
-    plt.close()
+    return _to_png(fig, datapoints)
 
 
 def ui_comparison_linechart(datapoints):
     """Generate UI performance comparison stacked bar chart."""
-    fig, ax = plt.subplots(figsize=(datapoints['width'] * 2, datapoints['height'] * 2), 
-                          dpi=300, facecolor='w')
+    _load_pyplot()
+    fig, ax = _subplots(datapoints, datapoints['width'] * 2, datapoints['height'] * 2, 300)
     
     b1 = ax.bar(datapoints['keys'], datapoints['latency_values'], color='#7EB26D')
     b2 = ax.bar(datapoints['keys'], datapoints['transfer_values'],
@@ -124,8 +188,7 @@ def ui_comparison_linechart(datapoints):
     ax.set_xticklabels(datapoints.get('labels', [str(dp) for dp in datapoints['keys']]))
     ax.set_xticks(datapoints['keys'])
     
-    fig.savefig(datapoints['path_to_save'], bbox_inches='tight')
-    plt.close()
+    return _to_png(fig, datapoints)
 
 
 def _plot_metrics(ax, datapoints, metrics_config):
@@ -152,26 +215,24 @@ def _plot_metrics(ax, datapoints, metrics_config):
 
 def ui_metrics_chart_pages(datapoints):
     """Generate UI page metrics trend chart."""
-    fig, ax = plt.subplots(figsize=(datapoints['width'], datapoints['height'] * 1.5), 
-                          dpi=72, facecolor='w')
+    _load_pyplot()
+    fig, ax = _subplots(datapoints, datapoints['width'], datapoints['height'] * 1.5, 72)
     
     metrics_config = [('ttfb', 'TTFB'), ('tbt', 'TBT'), ('lcp', 'LCP')]
     x_max, y_max = _plot_metrics(ax, datapoints, metrics_config)
     _setup_chart_style(ax, x_max, y_max, datapoints)
     
-    fig.savefig(datapoints['path_to_save'], bbox_inches='tight')
-    plt.close()
+    return _to_png(fig, datapoints)
 
 
 def ui_metrics_chart_actions(datapoints):
     """Generate UI action metrics trend chart."""
-    fig, ax = plt.subplots(figsize=(datapoints['width'], datapoints['height'] * 1.5), 
-                          dpi=72, facecolor='w')
+    _load_pyplot()
+    fig, ax = _subplots(datapoints, datapoints['width'], datapoints['height'] * 1.5, 72)
     
     metrics_config = [('cls', 'CLS'), ('tbt', 'TBT'), ('inp', 'INP')]
     x_max, y_max = _plot_metrics(ax, datapoints, metrics_config)
     _setup_chart_style(ax, x_max, y_max, datapoints)
     
-    fig.savefig(datapoints['path_to_save'], bbox_inches='tight')
-    plt.close()
+    return _to_png(fig, datapoints)
 
@@ -0,0 +1,130 @@
+# Copyright 2019 getcarrier.io
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from email.mime.image import MIMEImage
+from os import environ
+
+import chart_generator
+import svg_charts
+from chart_cache import chart_cache, chart_key
+
+
+# "matplotlib" - PNG charts, use it for email delivery. "svg" - dependency-free SVG charts, matplotlib is not
+# imported, but Gmail and Outlook desktop do not display inline image/svg+xml parts: only for clients that render them
+CHART_BACKEND = environ.get("CHART_BACKEND", "matplotlib")
+# "serial" - one after another in this process, "process" - in parallel worker processes, which start a
+# fresh interpreter per render call and only pay off with several vCPUs and many charts
+CHART_RENDER_MODE = environ.get("CHART_RENDER_MODE", "serial")
+# worker processes for "process" mode, 0 - one per CPU
+CHART_RENDER_WORKERS = int(environ.get("CHART_RENDER_WORKERS", 0))
+
+CHARTS = ["alerts_linechart", "barchart", "ui_comparison_linechart", "ui_metrics_chart_pages",
+          "ui_metrics_chart_actions"]
+SVG_CHARTS = ["alerts_linechart", "barchart", "ui_metrics_chart_pages", "ui_metrics_chart_actions"]
+
+# pyplot keeps global state, charts rendered in this process by concurrent events go one at a time
+_pyplot_lock = threading.Lock()
+
+
+def render_chart(chart, datapoints, backend="matplotlib"):
+    """
+    Render one chart spec with the function named `chart` of the backend, returns PNG or SVG bytes.
+    Charts without an SVG version are rendered with matplotlib.
+    """
+    if chart not in CHARTS:
+        raise ValueError(f"Unknown chart: {chart}")
+    if backend == "svg" and chart in SVG_CHARTS:
+        return getattr(svg_charts, chart)(datapoints)
+    with _pyplot_lock:
+        return _render_matplotlib(chart, datapoints)
+
+
+def _render_matplotlib(chart, datapoints):
+    return getattr(chart_generator, chart)(datapoints)
+
+
+def _render_in_worker(chart, datapoints, backend):
+    # a worker process renders one chart at a time, it never takes the lock of the parent's threads
+    if backend == "svg" and chart in SVG_CHARTS:
+        return getattr(svg_charts, chart)(datapoints)
+    return _render_matplotlib(chart, datapoints)
+
+
+def render_serial(specs, backend="matplotlib"):
+    return [render_chart(chart, datapoints, backend) for chart, datapoints in specs]
+
+
+def render_charts(specs, mode=None, workers=None, backend=None, profile=None):
+    """
+    Render (chart, datapoints) specs and return PNG/SVG bytes in the order of the specs.
+
+    In "process" mode matplotlib specs are rendered by a process pool, since matplotlib is CPU bound and
+    holds the GIL. SVG charts are cheap and always rendered serially. Falls back to serial rendering for
+    a single spec, a single worker, or when worker processes can not be started (e.g. no /dev/shm in AWS Lambda).
+    Charts already rendered for the same datapoints are returned from chart_cache without rendering.
+    `profile` picks the chart_generator rendering profile (dpi, size and PNG compression) for all specs.
+    """
+    specs = list(specs)
+    backend = backend or CHART_BACKEND
+    if profile:
+        specs = [(chart, dict(datapoints, profile=profile)) for chart, datapoints in specs]
+    if not chart_cache.enabled:
+        return _render(specs, mode, workers, backend)
+
+    # identical charts (same type, backend and datapoints) are served from the cache
+    keys = [chart_key(chart, datapoints, backend) for chart, datapoints in specs]
+    rendered = [chart_cache.get(key) for key in keys]
+    missing = [index for index, data in enumerate(rendered) if data is None]
+    if missing:
+        for index, data in zip(missing, _render([specs[index] for index in missing], mode, workers, backend)):
+            chart_cache.put(keys[index], data)
+            rendered[index] = data
+    return rendered
+
+
+def _render(specs, mode, workers, backend):
+    if not specs:
+        return []
+    mode = mode or CHART_RENDER_MODE
+    workers = min(workers or CHART_RENDER_WORKERS or os.cpu_count() or 1, len(specs))
+    if mode == "serial" or backend == "svg" or workers < 2:
+        return render_serial(specs, backend)
+    try:
+        # spawned, not forked: a fork copies _pyplot_lock held by a concurrent serial render and the
+        # worker would wait for it forever
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            return list(pool.map(_render_in_worker, *zip(*specs), [backend] * len(specs)))
+    except (OSError, ImportError, NotImplementedError, RuntimeError) as e:
+        # BrokenProcessPool is a RuntimeError
+        print(f"[CHARTS] Process pool unavailable, rendering serially: {e}")
+        return render_serial(specs, backend)
+
+
+def chart_images(specs, mode=None, workers=None, backend=None, profile=None):
+    """Render (chart, datapoints, content_id) specs into MIMEImage attachments."""
+    specs = list(specs)
+    rendered = render_charts([(chart, datapoints) for chart, datapoints, _ in specs], mode, workers, backend,
+                             profile)
+    if any(data.startswith(b'<svg') for data in rendered):
+        print("[CHARTS] SVG charts are attached inline, Gmail and Outlook desktop show them as broken images")
+    images = []
+    for data, (_, _, content_id) in zip(rendered, specs):
+        image = MIMEImage(data, _subtype='svg+xml') if data.startswith(b'<svg') else MIMEImage(data)
+        image.add_header('Content-ID', content_id)
+        images.append(image)
+    return images
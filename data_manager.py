@@ -13,12 +13,18 @@
 # limitations under the License.
 
 import datetime
+import itertools
 import operator
-import requests
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from time import time
 from influxdb import InfluxDBClient
 import numpy as np
 from os import environ
+from galloper_client import get_galloper_client
+from percentile_sketch import PercentileSketch
+from resource_registry import credential_key, current_batch_slot, registry
 
 
 SELECT_LAST_BUILDS_ID = "select distinct(id) from (select build_id as id, pct95 from api_comparison where " \
@@ -27,6 +33,8 @@ SELECT_LAST_BUILDS_ID = "select distinct(id) from (select build_id as id, pct95
 
 SELECT_LAST_BUILD_DATA = "select * from api_comparison where build_id=\'{}\'"
 
+SELECT_LAST_BUILDS_DATA = "select * from api_comparison where build_id=~/^({})$/"
+
 SELECT_USERS_COUNT = "select sum(\"max\") from (select max(\"user_count\") from \"users\" where " \
                      "build_id='{}' group by lg_id)"
 
@@ -66,6 +74,19 @@ REQUEST_STATUS_CODE_NAN = "select count(\"response_time\") from {} where build_i
                           "and method='{}' and status_code!~/1/ and status_code!~/2/ and status_code!~/3/ " \
                           "and status_code!~/4/ and status_code!~/5/"
 
+REQUEST_COUNTERS_GROUPED = "select count(\"response_time\") from {} where build_id='{}' " \
+                           "group by request_name, method, status, status_code"
+
+SELECT_RESPONSE_TIME_AGGREGATES = "select min(\"response_time\") as \"min\", max(\"response_time\") as \"max\", " \
+                                  "mean(\"response_time\") as \"mean\", " \
+                                  "percentile(\"response_time\", 50) as \"pct50\", " \
+                                  "percentile(\"response_time\", 75) as \"pct75\", " \
+                                  "percentile(\"response_time\", 90) as \"pct90\", " \
+                                  "percentile(\"response_time\", 95) as \"pct95\", " \
+                                  "percentile(\"response_time\", 99) as \"pct99\" from {} where build_id='{}'"
+
+SELECT_RESPONSE_TIME_AGGREGATES_GROUPED = SELECT_RESPONSE_TIME_AGGREGATES + " group by request_name, method"
+
 CALCULATE_TOTAL_THROUGHPUT = "select  sum(throughput) as \"throughput\", sum(ko) as \"ko\", " \
                              "sum(total) as \"total\" from api_comparison where build_id='{}'"
 
@@ -81,6 +102,49 @@ COMPARISON_RULES = {"gte": "ge", "lte": "le", "gt": "gt", "lt": "lt", "eq": "eq"
 
 BATCH_SIZE = int(environ.get("BATCH_SIZE", 5000000))
 
+# number of requests fetched and aggregated concurrently, 1 - serial
+INGEST_WORKERS = int(environ.get("INGEST_WORKERS", 1))
+
+# "grouped" - counters for all requests from a single GROUP BY query, "per_request" - one query per counter
+AGGREGATION_MODE = environ.get("AGGREGATION_MODE", "grouped")
+
+STATUS_CODE_CLASSES = ["1", "2", "3", "4", "5"]
+
+# "exact" - np.percentile over all samples, "sketch" - merged streaming sketches, no samples kept in memory,
+# "pushdown" - aggregated inside InfluxDB, no samples transferred
+PERCENTILE_MODE = environ.get("PERCENTILE_MODE", "exact")
+SKETCH_RELATIVE_ACCURACY = float(environ.get("SKETCH_RELATIVE_ACCURACY", 0.01))
+# samples per query in "sketch" mode, every request is paged so only one page is held in memory
+SKETCH_BATCH_SIZE = int(environ.get("SKETCH_BATCH_SIZE", 100000))
+# pushdown verification: also calculate client side and log metrics that differ more than the tolerance
+PUSHDOWN_VERIFY = environ.get("PUSHDOWN_VERIFY", "false")
+PUSHDOWN_TOLERANCE = float(environ.get("PUSHDOWN_TOLERANCE", 0.05))
+
+PERCENTILES = [50, 75, 90, 95, 99]
+
+RESPONSE_TIME_DTYPE = np.dtype(environ.get("RESPONSE_TIME_DTYPE", "int32"))
+
+
+def build_ids_regex(build_ids):
+    """Alternation of build ids for an InfluxQL regex literal, metacharacters and slashes escaped."""
+    return "|".join(re.escape(_id).replace("/", "\\/") for _id in build_ids)
+
+
+def response_times_batch(result, dtype=None):
+    """
+    Convert a response_time query result into a typed numpy array straight from the raw series values,
+    without building point dicts or intermediate lists. Returns the array and the time of the last point.
+    """
+    dtype = dtype or RESPONSE_TIME_DTYPE
+    series = result.raw.get("series") or []
+    if not series or not series[0].get("values"):
+        return np.empty(0, dtype=dtype), None
+    columns = series[0]["columns"]
+    values = series[0]["values"]
+    rt_index, time_index = columns.index("response_time"), columns.index("time")
+    batch = np.fromiter((row[rt_index] for row in values), dtype=dtype, count=len(values))
+    return batch, values[-1][time_index]
+
 
 class DataManager(object):
     def __init__(self, arguments, galloper_url, token, project_id, logger=None):
@@ -101,8 +165,14 @@ class DataManager(object):
                 logger.setLevel(logging.INFO)
         
         self.logger = logger
-        self.client = InfluxDBClient(self.args["influx_host"], self.args['influx_port'],
-                                     username=self.args['influx_user'], password=self.args['influx_password'])
+        # one client per Influx host, credentials and batch slot (switch_database is not thread safe),
+        # reused by warm invocations
+        self.client = self.shared_influx_client()
+        self._local = threading.local()
+
+    @property
+    def galloper_client(self):
+        return get_galloper_client(self.galloper_url, self.token)
 
     def delete_test_data(self):
         self.client.switch_database(self.args['influx_db'])
@@ -119,20 +189,19 @@ class DataManager(object):
                                                                   self.args['build_id'])).get_points())[0]["count"])
         self.logger.info(f"Total requests count = {total_requests_count}")
 
-        # Get request names and methods
-        request_names = list(self.client.query(GET_REQUEST_NAMES.format(self.args['influx_db'], self.args['simulation'],
-                                                                        self.args['build_id'])).get_points())
-        request_names = list(each['value'] for each in request_names)
-        reqs = []
-        for request_name in request_names:
-            methods = list(self.client.query(GET_REQUEST_METHODS.format(self.args['influx_db'], self.args['simulation'],
-                                                                        self.args['build_id'],
-                                                                        request_name)).get_points())
-            for method in methods:
-                reqs.append({
-                    "request_name": request_name,
-                    "method": method["value"]
-                })
+        # Get request names, methods and per request counters
+        reqs = None
+        if self.args.get('aggregation_mode', AGGREGATION_MODE) == "grouped":
+            try:
+                reqs = self.get_grouped_request_counters(total_requests_count)
+            except Exception as e:
+                self.logger.warning(f"Grouped aggregation failed, falling back to per request queries: {e}")
+        if reqs is None:
+            reqs = self.get_requests()
+            counters = self.map_requests(lambda req: self.get_request_counters(req['request_name'], req['method']),
+                                         reqs)
+            for req, req_counters in zip(reqs, counters):
+                req.update(req_counters)
 
         # calculate test duration and throughput
         first_request = self.client.query(FIRST_REQUEST.format(self.args['simulation'], self.args['build_id']))
@@ -149,83 +218,28 @@ class DataManager(object):
         self.logger.info(f"duration = {duration}")
         self.logger.info(f"throughput = {_throughput}")
 
-        data = np.array([])
+        percentile_mode = self.args.get('percentile_mode', PERCENTILE_MODE)
+        self.logger.info(f"percentile mode = {percentile_mode}")
         for req in reqs:
             req['simulation'] = self.args['simulation']
             req['test_type'] = self.args['type']
             req['env'] = self.args['env']
             req['build_id'] = self.args['build_id']
-            req["total"] = int(list(self.client.query(REQUEST_COUNT.format(self.args['simulation'],
-                                                                           self.args['build_id'], req['request_name'],
-                                                                           req['method'])).get_points())[0]["count"])
             req["throughput"] = round(float(req["total"]) / float(duration), 3)
-            req["times"] = np.array([])
 
-            # calculate response time metrics per request
-            response_time_q = SELECT_TEST_DATA.format(self.args['simulation'], self.args['build_id'],
-                                                      req["request_name"], req["method"])
-            if req["total"] <= BATCH_SIZE:
-                _data = list(self.client.query(response_time_q).get_points())
-                req["times"] = np.append(req["times"], list(int(each["response_time"]) for each in _data))
+        # calculate response time metrics per request and overall
+        response_times = None
+        if percentile_mode == "pushdown":
+            try:
+                response_times = self.get_pushdown_response_times(reqs)
+            except Exception as e:
+                self.logger.warning(f"Pushdown aggregation failed, falling back to client side percentiles: {e}")
+                percentile_mode = "exact"
             else:
-                shards = req["total"] // BATCH_SIZE
-                last_read_time = '1970-01-01T19:25:26.005Z'
-                for i in range(shards):
-                    response_time_q = SELECT_TEST_DATA_OFFSET.format(self.args['simulation'], self.args['build_id'],
-                                                                     req['request_name'], req['method'],
-                                                                     last_read_time, BATCH_SIZE)
-                    _data = list(self.client.query(response_time_q).get_points())
-                    last_read_time = _data[-1]['time']
-                    req["times"] = np.append(req["times"], list(int(each["response_time"]) for each in _data))
-
-                if req["total"] % BATCH_SIZE != 0:
-                    response_time_q = SELECT_TEST_DATA_OFFSET.format(self.args['simulation'], self.args['build_id'],
-                                                                     req['request_name'], req['method'],
-                                                                     last_read_time, BATCH_SIZE)
-                    _data = list(self.client.query(response_time_q).get_points())
-                    req["times"] = np.append(req["times"], list(int(each["response_time"]) for each in _data))
-            data = np.append(data, req["times"])
-
-            req["min"] = req.get("times").min()
-            req["max"] = req.get("times").max()
-            req["mean"] = req.get("times").mean()
-
-            for pct in ["50", "75", "90", "95", "99"]:
-                req[f"pct{pct}"] = int(np.percentile(req.get("times"), int(pct), interpolation="linear"))
-
-            del req["times"]
-
-            # calculate status and status codes per request
-            ok_count = list(self.client.query(REQUEST_STATUS.format(self.args['simulation'],
-                                                                    self.args['build_id'], req['request_name'],
-                                                                    req['method'], "OK")).get_points())
-            req["OK"] = ok_count[0]["count"] if len(ok_count) > 0 else 0
-            ko_count = list(self.client.query(REQUEST_STATUS.format(self.args['simulation'],
-                                                                    self.args['build_id'], req['request_name'],
-                                                                    req['method'], "KO")).get_points())
-            req["KO"] = ko_count[0]["count"] if len(ko_count) > 0 else 0
-            for code in ["1", "2", "3", "4", "5"]:
-                _tmp = list(self.client.query(REQUEST_STATUS_CODE.format(self.args['simulation'],
-                                                                         self.args['build_id'], req['request_name'],
-                                                                         req['method'], code)).get_points())
-                req[f"{code}xx"] = _tmp[0]["count"] if len(_tmp) > 0 else 0
-
-            _NaN = list(self.client.query(REQUEST_STATUS_CODE_NAN.format(self.args['simulation'],
-                                                                         self.args['build_id'], req['request_name'],
-                                                                         req['method'])).get_points())
-            req["NaN"] = _NaN[0]["count"] if len(_NaN) > 0 else 0
-
-        # calculate overall response time metrics
-        response_times = {
-            "min": round(float(data.min()), 2),
-            "max": round(float(data.max()), 2),
-            "mean": round(float(data.mean()), 2),
-            "pct50": int(np.percentile(data, 50, interpolation="linear")),
-            "pct75": int(np.percentile(data, 75, interpolation="linear")),
-            "pct90": int(np.percentile(data, 90, interpolation="linear")),
-            "pct95": int(np.percentile(data, 95, interpolation="linear")),
-            "pct99": int(np.percentile(data, 99, interpolation="linear"))
-        }
+                if str(self.args.get('verify_pushdown', PUSHDOWN_VERIFY)).lower() in ["true", "1"]:
+                    self.verify_pushdown(reqs, response_times)
+        if response_times is None:
+            response_times = self.get_client_response_times(reqs, percentile_mode)
 
         # Write data to comparison db
         if not reqs:
@@ -297,13 +311,285 @@ class DataManager(object):
             self.logger.error("Failed connection to " + self.args["influx_host"] + ", database - comparison")
         return user_count, duration, response_times
 
+    def new_influx_client(self):
+        return InfluxDBClient(self.args["influx_host"], self.args['influx_port'],
+                              username=self.args['influx_user'], password=self.args['influx_password'])
+
+    def shared_influx_client(self, slot=None, worker=None):
+        """Registry client of the batch slot, or of one of its ingest workers, closed when it expires."""
+        slot = current_batch_slot() if slot is None else slot
+        key = credential_key(self.args["influx_host"], self.args['influx_port'], self.args['influx_user'],
+                             self.args['influx_password'], slot, worker)
+        return registry.get("influx", key, self.new_influx_client, check=lambda client: client.ping(),
+                            close=lambda client: client.close())
+
+    def query_client(self):
+        """InfluxDB client for the current thread: every ingest worker uses its own client."""
+        return getattr(self._local, "client", None) or self.client
+
+    def _init_worker(self, workers, batch_slot):
+        # worker n of every pool reuses the same client, so warm invocations do not open new sessions
+        self._local.client = self.shared_influx_client(batch_slot, next(workers))
+        self._local.client.switch_database(self.args['influx_db'])
+
+    def map_requests(self, func, items):
+        """
+        Run func over items with a bounded pool of INGEST_WORKERS threads (serial when 1).
+        Results are returned in the order of items, same as the serial path.
+        """
+        workers = int(self.args.get('ingest_workers', INGEST_WORKERS))
+        items = list(items)
+        if workers <= 1 or len(items) <= 1:
+            return list(map(func, items))
+        with ThreadPoolExecutor(max_workers=min(workers, len(items)), initializer=self._init_worker,
+                                initargs=(itertools.count(), current_batch_slot())) as pool:
+            return list(pool.map(func, items))
+
+    def get_client_response_times(self, reqs, percentile_mode="exact"):
+        """
+        Calculate min/max/mean/percentiles from raw response times fetched from InfluxDB.
+        Sets per request metrics on reqs and returns the overall ("All") metrics.
+        """
+        relative_accuracy = float(self.args.get('sketch_relative_accuracy', SKETCH_RELATIVE_ACCURACY))
+        sketch_batch_size = int(self.args.get('sketch_batch_size', SKETCH_BATCH_SIZE))
+        # exact mode: one preallocated buffer for all samples, every request fills its own slice in place
+        data = np.empty(sum(req["total"] for req in reqs) if percentile_mode != "sketch" else 0,
+                        dtype=RESPONSE_TIME_DTYPE)
+        offsets = np.cumsum([0] + [req["total"] for req in reqs[:-1]]) if reqs else []
+
+        def calculate(index):
+            req = reqs[index]
+            if percentile_mode == "sketch":
+                sketch = PercentileSketch(relative_accuracy)
+                for batch in self.iter_response_times(req, page_size=sketch_batch_size):
+                    sketch.add(batch)
+                req["min"], req["max"], req["mean"] = sketch.min, sketch.max, sketch.mean
+                for pct in PERCENTILES:
+                    req[f"pct{pct}"] = int(sketch.percentile(pct))
+                return sketch
+
+            offset = int(offsets[index])
+            times = data[offset:offset + req["total"]]
+            filled = self.fill_response_times(req, times)
+            if filled < req["total"]:
+                self.logger.warning(f"{req['request_name']} {req['method']}: {filled} of {req['total']} "
+                                    f"response times fetched")
+            times = times[:filled]
+            req["min"] = times.min()
+            req["max"] = times.max()
+            req["mean"] = times.mean()
+            for pct, value in zip(PERCENTILES, np.percentile(times, PERCENTILES)):
+                req[f"pct{pct}"] = int(value)
+            return offset, filled
+
+        # partial results come back in request order, so merging does not depend on worker scheduling
+        partials = self.map_requests(calculate, range(len(reqs)))
+
+        if percentile_mode == "sketch":
+            overall_sketch = PercentileSketch(relative_accuracy)
+            for sketch in partials:
+                overall_sketch.merge(sketch)
+            response_times = {
+                "min": round(float(overall_sketch.min), 2),
+                "max": round(float(overall_sketch.max), 2),
+                "mean": round(float(overall_sketch.mean), 2)
+            }
+            for pct in PERCENTILES:
+                response_times[f"pct{pct}"] = int(overall_sketch.percentile(pct))
+            return response_times
+
+        if sum(filled for _, filled in partials) < data.size:
+            data = np.concatenate([data[start:start + filled] for start, filled in partials])
+        response_times = {
+            "min": round(float(data.min()), 2),
+            "max": round(float(data.max()), 2),
+            "mean": round(float(data.mean()), 2)
+        }
+        for pct, value in zip(PERCENTILES, np.percentile(data, PERCENTILES)):
+            response_times[f"pct{pct}"] = int(value)
+        return response_times
+
+    def get_pushdown_response_times(self, reqs):
+        """
+        Calculate min/max/mean/percentiles inside InfluxDB with one grouped query for all requests
+        and one query for the overall row, without transferring raw samples.
+        Note: InfluxDB percentile() is nearest rank, np.percentile interpolates linearly.
+        """
+        result = self.client.query(SELECT_RESPONSE_TIME_AGGREGATES_GROUPED.format(self.args['simulation'],
+                                                                                  self.args['build_id']))
+        aggregates = {}
+        for (_, tags), points in result.items():
+            aggregates[(tags.get("request_name", ""), tags.get("method", ""))] = next(points)
+        for req in reqs:
+            aggregate = aggregates.get((req["request_name"], req["method"]))
+            if not aggregate:
+                raise Exception(f"No aggregates for {req['request_name']} {req['method']}")
+            req["min"], req["max"], req["mean"] = aggregate["min"], aggregate["max"], aggregate["mean"]
+            for pct in PERCENTILES:
+                req[f"pct{pct}"] = int(aggregate[f"pct{pct}"])
+
+        overall = list(self.client.query(SELECT_RESPONSE_TIME_AGGREGATES.format(self.args['simulation'],
+                                                                                self.args['build_id'])).get_points())[0]
+        response_times = {
+            "min": round(float(overall["min"]), 2),
+            "max": round(float(overall["max"]), 2),
+            "mean": round(float(overall["mean"]), 2)
+        }
+        for pct in PERCENTILES:
+            response_times[f"pct{pct}"] = int(overall[f"pct{pct}"])
+        return response_times
+
+    def verify_pushdown(self, reqs, response_times):
+        """
+        Compare pushdown metrics with client side (exact) metrics and log every value that differs
+        more than PUSHDOWN_TOLERANCE (relative). Pushdown values are kept, mismatches are returned.
+        """
+        tolerance = float(self.args.get('pushdown_tolerance', PUSHDOWN_TOLERANCE))
+        client_reqs = [dict(req) for req in reqs]
+        client_response_times = self.get_client_response_times(client_reqs, "exact")
+        pairs = [(f"{req['request_name']} {req['method']}", req, client_req)
+                 for req, client_req in zip(reqs, client_reqs)]
+        pairs.append(("All", response_times, client_response_times))
+
+        mismatches = []
+        for name, pushdown, client in pairs:
+            for metric in ["min", "max", "mean"] + [f"pct{pct}" for pct in PERCENTILES]:
+                expected, actual = float(client[metric]), float(pushdown[metric])
+                if abs(actual - expected) > tolerance * max(abs(expected), 1):
+                    mismatches.append({"request": name, "metric": metric, "pushdown": actual, "client": expected})
+                    self.logger.warning(f"Pushdown mismatch for {name} {metric}: pushdown={actual}, "
+                                        f"client={expected}, tolerance={tolerance * 100}%")
+        self.logger.info(f"Pushdown verification: {len(mismatches)} mismatches, tolerance={tolerance * 100}%")
+        self.pushdown_mismatches = mismatches
+        return mismatches
+
+    def iter_response_times(self, req, page_size=None):
+        """
+        Yield response times of a request as typed numpy batches of at most BATCH_SIZE samples.
+        With `page_size` the request is always paged through SELECT_TEST_DATA_OFFSET in batches of that size.
+        """
+        if page_size is None and req["total"] <= BATCH_SIZE:
+            response_time_q = SELECT_TEST_DATA.format(self.args['simulation'], self.args['build_id'],
+                                                      req["request_name"], req["method"])
+            batch, _ = response_times_batch(self.query_client().query(response_time_q))
+            yield batch
+            return
+        page_size = page_size or BATCH_SIZE
+        shards = req["total"] // page_size
+        if req["total"] % page_size != 0:
+            shards += 1
+        last_read_time = '1970-01-01T19:25:26.005Z'
+        for i in range(shards):
+            response_time_q = SELECT_TEST_DATA_OFFSET.format(self.args['simulation'], self.args['build_id'],
+                                                             req['request_name'], req['method'],
+                                                             last_read_time, page_size)
+            batch, last_read_time = response_times_batch(self.query_client().query(response_time_q))
+            if not batch.size:
+                break
+            yield batch
+
+    def fill_response_times(self, req, buffer):
+        """Copy response time batches of a request into a preallocated buffer, return the number of samples."""
+        filled = 0
+        for batch in self.iter_response_times(req):
+            size = min(batch.size, buffer.size - filled)
+            if size < batch.size:
+                self.logger.warning(f"{req['request_name']} {req['method']}: got more response times than "
+                                    f"counted ({req['total']}), extra samples ignored")
+            buffer[filled:filled + size] = batch[:size]
+            filled += size
+        return filled
+
+    def get_requests(self):
+        request_names = list(self.client.query(GET_REQUEST_NAMES.format(self.args['influx_db'], self.args['simulation'],
+                                                                        self.args['build_id'])).get_points())
+        request_names = list(each['value'] for each in request_names)
+        reqs = []
+        for request_name in request_names:
+            methods = list(self.client.query(GET_REQUEST_METHODS.format(self.args['influx_db'], self.args['simulation'],
+                                                                        self.args['build_id'],
+                                                                        request_name)).get_points())
+            for method in methods:
+                reqs.append({
+                    "request_name": request_name,
+                    "method": method["value"]
+                })
+        return reqs
+
+    def get_request_counters(self, request_name, method):
+        """Per request fallback: total, OK/KO and status code counters with one query per counter."""
+        client = self.query_client()
+        counters = {}
+        counters["total"] = int(list(client.query(REQUEST_COUNT.format(self.args['simulation'],
+                                                                       self.args['build_id'], request_name,
+                                                                       method)).get_points())[0]["count"])
+        for status in ["OK", "KO"]:
+            _tmp = list(client.query(REQUEST_STATUS.format(self.args['simulation'], self.args['build_id'],
+                                                           request_name, method, status)).get_points())
+            counters[status] = _tmp[0]["count"] if len(_tmp) > 0 else 0
+        for code in STATUS_CODE_CLASSES:
+            _tmp = list(client.query(REQUEST_STATUS_CODE.format(self.args['simulation'], self.args['build_id'],
+                                                                request_name, method, code)).get_points())
+            counters[f"{code}xx"] = _tmp[0]["count"] if len(_tmp) > 0 else 0
+        _NaN = list(client.query(REQUEST_STATUS_CODE_NAN.format(self.args['simulation'], self.args['build_id'],
+                                                                request_name, method)).get_points())
+        counters["NaN"] = _NaN[0]["count"] if len(_NaN) > 0 else 0
+        return counters
+
+    def get_grouped_request_counters(self, total_requests_count):
+        """
+        Single pass aggregation: total, OK/KO and status code counters for every request
+        from one GROUP BY request_name, method, status, status_code query, pivoted in memory.
+        Raises if the grouped result does not add up or has no status / status_code tags, so the caller can
+        fall back to per request queries.
+        """
+        result = self.client.query(REQUEST_COUNTERS_GROUPED.format(self.args['simulation'], self.args['build_id']))
+        counters = {}
+        statuses = set()
+        status_codes = set()
+        for (_, tags), points in result.items():
+            count = sum(int(point["count"]) for point in points)
+            key = (tags.get("request_name", ""), tags.get("method", ""))
+            if key not in counters:
+                counters[key] = {"total": 0, "OK": 0, "KO": 0, "NaN": 0}
+                counters[key].update({f"{code}xx": 0 for code in STATUS_CODE_CLASSES})
+            req = counters[key]
+            req["total"] += count
+            status = tags.get("status", "")
+            statuses.add(status)
+            if status in ["OK", "KO"]:
+                req[status] += count
+            # same bucketing as REQUEST_STATUS_CODE (=~/^N/) and REQUEST_STATUS_CODE_NAN (!~/N/ for 1..5)
+            status_code = str(tags.get("status_code") or "")
+            status_codes.add(status_code)
+            if status_code[:1] in STATUS_CODE_CLASSES:
+                req[f"{status_code[:1]}xx"] += count
+            if not any(code in status_code for code in STATUS_CODE_CLASSES):
+                req["NaN"] += count
+
+        grouped_total = sum(req["total"] for req in counters.values())
+        if not counters or grouped_total != total_requests_count:
+            raise Exception(f"grouped counters total {grouped_total} != requests count {total_requests_count}")
+        if not statuses - {""}:
+            raise Exception("status is not available as a tag")
+        if not status_codes - {""}:
+            # every group would be counted as NaN and the 1xx-5xx counters written as zeros
+            raise Exception("status_code is not available as a tag")
+        self.logger.info(f"Grouped aggregation: {len(counters)} requests collected in a single query")
+        return [dict(request_name=request_name, method=method, **counters[(request_name, method)])
+                for request_name, method in sorted(counters)]
+
     def get_api_test_info(self):
         tests_data = self.get_last_builds()
         if len(tests_data) == 0:
             raise Exception("No data found for given parameters")
-        last_test_data = tests_data[0]
         self.args['build_id'] = tests_data[0][0]['build_id']
         baseline = self.get_baseline()
+        return self.evaluate_api_test(tests_data, baseline)
+
+    def evaluate_api_test(self, tests_data, baseline):
+        """Thresholds and baseline comparison for already fetched builds history and baseline."""
+        last_test_data = tests_data[0]
         total_checked, violations, thresholds = self.get_thresholds(last_test_data, add_green=True)
         # Update args with calculated SLA failed rate (overwrite old value from event)
         self.args['missed_threshold_rate'] = violations
@@ -316,21 +602,20 @@ class DataManager(object):
 
     def get_last_builds(self):
         self.client.switch_database(self.args['comparison_db'])
-        tests_data = []
-        build_ids = []
-        
         last_builds = self.client.query(SELECT_LAST_BUILDS_ID.format(
             self.args['test'], self.args['test_type'], str(self.args['users']), self.args['test'],
             str(self.args['test_limit'])))
-        for test in list(last_builds.get_points()):
-            if test['distinct'] not in build_ids:
-                build_ids.append(test['distinct'])
+        build_ids = list(dict.fromkeys(test['distinct'] for test in last_builds.get_points()))
+        if not build_ids:
+            return []
 
-        for _id in build_ids:
-            test_data = self.client.query(SELECT_LAST_BUILD_DATA.format(_id))
-            test_points = list(test_data.get_points())
-            tests_data.append(test_points)
-        return tests_data
+        # one query for all builds, rows are split by build_id keeping the order of SELECT_LAST_BUILDS_ID
+        tests_data = {_id: [] for _id in build_ids}
+        builds_data = self.client.query(SELECT_LAST_BUILDS_DATA.format(build_ids_regex(build_ids)))
+        for point in builds_data.get_points():
+            if point.get('build_id') in tests_data:
+                tests_data[point['build_id']].append(point)
+        return list(tests_data.values())
 
     def get_user_count(self):
         self.client.switch_database(self.args['influx_db'])
@@ -366,11 +651,8 @@ class DataManager(object):
         every_rt_deviation = per_request_results.get('response_time_deviation', 0)
         
         # Fetch SLA thresholds for potential use (but baseline uses Quality Gate deviations)
-        headers = {'Authorization': f'bearer {self.token}'} if self.token else {}
-        thresholds_url = f"{self.galloper_url}/api/v1/backend_performance/thresholds/{self.project_id}?" \
-                         f"test={self.args['simulation']}&env={self.args['env']}&order=asc"
         try:
-            unfiltered_thresholds = requests.get(thresholds_url, headers={**headers, 'Content-type': 'application/json'}).json()
+            unfiltered_thresholds = self.fetch_thresholds()
         except Exception as e:
             self.logger.error(f"Failed to fetch thresholds for baseline: {e}")
             unfiltered_thresholds = []
@@ -642,11 +924,16 @@ class DataManager(object):
         last_build = self.get_last_build()
         return self.get_thresholds(last_build)
 
+    def fetch_thresholds(self):
+        """Unfiltered backend thresholds of the test, fetched once per invocation."""
+        thresholds_url = f"/api/v1/backend_performance/thresholds/{self.project_id}?" \
+                         f"test={self.args['simulation']}&env={self.args['env']}&order=asc"
+        return self.galloper_client.get_json(thresholds_url, cache=True)
+
     def get_baseline(self):
-        headers = {'Authorization': f'bearer {self.token}'} if self.token else {}
-        baseline_url = f"{self.galloper_url}/api/v1/backend_performance/baseline/{self.project_id}?" \
+        baseline_url = f"/api/v1/backend_performance/baseline/{self.project_id}?" \
                        f"test_name={self.args['simulation']}&env={self.args['env']}"
-        res = requests.get(baseline_url, headers={**headers, 'Content-type': 'application/json'}).json()
+        res = self.galloper_client.get(baseline_url).json()
         return res["baseline"]
 
     def get_last_build(self):
@@ -763,10 +1050,7 @@ class DataManager(object):
         compare_with_thresholds = []
         total_checked = 0
         total_violated = 0
-        headers = {'Authorization': f'bearer {self.token}'} if self.token else {}
-        thresholds_url = f"{self.galloper_url}/api/v1/backend_performance/thresholds/{self.project_id}?" \
-                         f"test={self.args['simulation']}&env={self.args['env']}&order=asc"
-        _thresholds = requests.get(thresholds_url, headers={**headers, 'Content-type': 'application/json'}).json()
+        _thresholds = self.fetch_thresholds()
 
         # Check what SLA metrics are actually configured BEFORE filtering by comparison_metric
         # This is used for warning generation in report_builder
@@ -1,7 +1,26 @@
 import smtplib
 import ssl
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from os import environ
+
+from resource_registry import credential_key, current_batch_slot, registry
+
+
+# "individual" - one message per recipient with its own To header, "bcc" - one message for all recipients
+EMAIL_SEND_MODE = environ.get("EMAIL_SEND_MODE", "individual")
+SEND_MODES = ["individual", "bcc"]
+UNDISCLOSED_RECIPIENTS = "undisclosed-recipients:;"
+# parallel SMTP connections for "individual" mode, recipients are distributed across them
+SMTP_POOL_SIZE = int(environ.get("SMTP_POOL_SIZE", 4))
+# reconnects of one connection per recipient when the server drops the session
+SMTP_RECONNECTS = int(environ.get("SMTP_RECONNECTS", 2))
+SMTP_TIMEOUT = float(environ.get("SMTP_TIMEOUT", 60))
+
+SENT = "sent"
+# 421 - service not available, the server is closing the session
+RECONNECT_CODES = (421,)
 
 
 class EmailClient(object):
@@ -14,31 +33,176 @@ class EmailClient(object):
         self.sender = arguments['smtp_sender']
         if self.sender is None:
             self.sender = self.user
+        self.send_mode = arguments.get('email_send_mode') or EMAIL_SEND_MODE
+        if self.send_mode not in SEND_MODES:
+            raise Exception(f"Incorrect value for email_send_mode: {self.send_mode}. Must be one of {SEND_MODES}")
+        self.pool_size = int(arguments.get('smtp_pool_size') or SMTP_POOL_SIZE)
+        # concurrent events of a batch never share a connection
+        self.batch_slot = current_batch_slot()
+        # spooled emails are only retried through the SMTP account that spooled them
+        self.account = credential_key(self.host, self.port, self.user)
+
+    @staticmethod
+    def get_recipients(users_to):
+        recipients = []
+        for recipient in users_to:
+            if all(i in recipient for i in ["<mailto:", "|"]):
+                recipient = recipient.split("|")[1].replace(">", "").replace("<", "")
+            recipients.append(recipient)
+        return recipients
 
-    def send_email(self, email):
+    def build_message(self, email):
+        """Message without the To header, serialized once and shared by all recipients."""
+        msg_root = MIMEMultipart('related')
+        msg_root['Subject'] = email.subject
+        msg_root['From'] = self.sender
+        msg_alternative = MIMEMultipart('alternative')
+        msg_alternative.attach(MIMEText(email.email_body, 'html'))
+        msg_root.attach(msg_alternative)
+        for chart in email.charts:
+            msg_root.attach(chart)
+        return msg_root.as_string()
+
+    def connect(self):
         if self.port == 465:
-            server = smtplib.SMTP_SSL(host=self.host, port=self.port)
+            server = smtplib.SMTP_SSL(host=self.host, port=self.port, timeout=SMTP_TIMEOUT)
             server.ehlo()
         else:
-            server = smtplib.SMTP(host=self.host, port=self.port)
+            server = smtplib.SMTP(host=self.host, port=self.port, timeout=SMTP_TIMEOUT)
             server.starttls()
         try:
             server.login(self.user, self.password)
+        except Exception:
+            self._quit(server)
+            raise
+        return server
 
-            for recipient in email.users_to:
-                if all(i in recipient for i in ["<mailto:", "|"]):
-                    recipient = recipient.split("|")[1].replace(">", "").replace("<", "")
-                msg_root = MIMEMultipart('related')
-                msg_root['Subject'] = email.subject
-                msg_root['From'] = self.sender
-                msg_root['To'] = recipient
-                msg_alternative = MIMEMultipart('alternative')
-                msg_alternative.attach(MIMEText(email.email_body, 'html'))
-                msg_root.attach(msg_alternative)
-                for chart in email.charts:
-                    msg_root.attach(chart)
-
-                server.sendmail(self.sender, recipient, msg_root.as_string())
-                print('Send')
-        finally:
+    @staticmethod
+    def _quit(server):
+        try:
             server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def send_email(self, email, spool=None):
+        """
+        Deliver the email and return the delivery report: {recipient: "sent" or the error}.
+        Raises when the email was not delivered to some of the recipients, after trying all of them.
+        With a MailSpool the serialized email is spooled first and the recipients it was not delivered to
+        are kept there for `resume`. When the spool can not be written the email is delivered directly.
+        """
+        recipients = self.get_recipients(email.users_to)
+        message = self.build_message(email)
+        entry_id = None
+        if spool:
+            try:
+                entry_id = spool.put(message, recipients, self.send_mode, email.subject, self.account)
+            except OSError as e:
+                print(f"Mail spool is not writable, delivering without it: {e}")
+        report = self.deliver(recipients, message)
+        if entry_id:
+            try:
+                state = spool.record(entry_id, report, SENT)
+                if state["pending"]:
+                    print(f"Email {entry_id} is kept in the mail spool, attempt {state['attempts']}: "
+                          f"{state['status']}")
+            except (OSError, ValueError) as e:
+                print(f"Could not record delivery of email {entry_id} in the mail spool: {e}")
+        self._check_report(report)
+        return report
+
+    def resume(self, spool, now=None):
+        """Retry due emails this SMTP account spooled, returns {entry_id: delivery report}."""
+        reports = {}
+        for entry_id in spool.due(now, self.account):
+            if not spool.claim(entry_id):
+                continue
+            state = spool.state(entry_id)
+            reports[entry_id] = self.deliver(state["pending"], spool.message(entry_id), state["send_mode"])
+            state = spool.record(entry_id, reports[entry_id], SENT)
+            print(f"Spooled email {entry_id} '{state['subject']}', attempt {state['attempts']}: {state['status']}")
+        return reports
+
+    def deliver(self, recipients, message, send_mode=None):
+        if (send_mode or self.send_mode) == "bcc":
+            return self._send_bcc(recipients, message)
+        return self._send_individual(recipients, message)
+
+    @staticmethod
+    def _check_report(report):
+        failed = {recipient: status for recipient, status in report.items() if status != SENT}
+        print(f"Send to {len(report) - len(failed)} of {len(report)} recipients")
+        if failed:
+            raise Exception(f"Email was not delivered to {len(failed)} recipients: {failed}")
+
+    @staticmethod
+    def _smtp_status(code, error):
+        """Report entry of an SMTP reply, smtplib keeps the reply text as bytes."""
+        if isinstance(error, bytes):
+            error = error.decode("utf-8", "replace")
+        return f"{code} {error}"
+
+    def _connection(self, slot):
+        """Logged in connection number `slot` of the pool, kept open for warm invocations."""
+        return registry.get("smtp", self._connection_key(slot), self.connect,
+                            check=lambda server: server.noop()[0] == 250, close=self._quit)
+
+    def _connection_key(self, slot):
+        return credential_key(self.host, self.port, self.user, self.password, self.batch_slot, slot)
+
+    def _send_bcc(self, recipients, message):
+        # recipients only go to the envelope, nobody sees the list
+        try:
+            server = self._connection(0)
+            refused = server.sendmail(self.sender, recipients, f"To: {UNDISCLOSED_RECIPIENTS}\n{message}")
+        except smtplib.SMTPRecipientsRefused as e:
+            refused = e.recipients
+        except (smtplib.SMTPException, OSError) as e:
+            registry.discard("smtp", self._connection_key(0))
+            refused = {recipient: f"{type(e).__name__}: {e}" for recipient in recipients}
+        return {recipient: self._smtp_status(*refused[recipient]) if isinstance(refused.get(recipient), tuple)
+                else refused.get(recipient, SENT) for recipient in recipients}
+
+    def _send_individual(self, recipients, message):
+        workers = max(min(self.pool_size, len(recipients)), 1)
+        # every worker owns one connection and delivers its share of the recipients
+        shares = [recipients[index::workers] for index in range(workers)]
+        if workers == 1:
+            reports = [self._deliver(shares[0], message, 0)]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                reports = list(pool.map(self._deliver, shares, [message] * workers, range(workers)))
+        report = {}
+        for share_report in reports:
+            report.update(share_report)
+        return {recipient: report[recipient] for recipient in recipients}
+
+    def _deliver(self, recipients, message, slot):
+        report = {}
+        for recipient in recipients:
+            for attempt in range(SMTP_RECONNECTS + 1):
+                try:
+                    self._connection(slot).sendmail(self.sender, recipient, f"To: {recipient}\n{message}")
+                    report[recipient] = SENT
+                    break
+                except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError) as e:
+                    # dropped session, the next attempt reconnects
+                    report[recipient] = f"{type(e).__name__}: {e}"
+                    registry.discard("smtp", self._connection_key(slot))
+                except smtplib.SMTPRecipientsRefused as e:
+                    # refused recipient, there is no point in retrying
+                    report[recipient] = self._smtp_status(*e.recipients[recipient])
+                    break
+                except smtplib.SMTPResponseException as e:
+                    report[recipient] = self._smtp_status(e.smtp_code, e.smtp_error)
+                    if e.smtp_code not in RECONNECT_CODES:
+                        break
+                    registry.discard("smtp", self._connection_key(slot))
+                except smtplib.SMTPException as e:
+                    report[recipient] = f"{type(e).__name__}: {e}"
+                    break
+                except OSError as e:
+                    # broken connection (SMTPException is an OSError too, so this comes last)
+                    report[recipient] = f"{type(e).__name__}: {e}"
+                    registry.discard("smtp", self._connection_key(slot))
+        return report
@@ -0,0 +1,132 @@
+# Copyright 2019 getcarrier.io
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from copy import deepcopy
+from os import environ
+from time import perf_counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from resource_registry import credential_key, registry
+
+
+GALLOPER_CONNECT_TIMEOUT = float(environ.get("GALLOPER_CONNECT_TIMEOUT", 5))
+GALLOPER_READ_TIMEOUT = float(environ.get("GALLOPER_READ_TIMEOUT", 60))
+# retries with exponential backoff (backoff * 2 ** retry seconds) for connection errors, 429 and 5xx
+GALLOPER_RETRIES = int(environ.get("GALLOPER_RETRIES", 3))
+GALLOPER_BACKOFF = float(environ.get("GALLOPER_BACKOFF", 0.5))
+GALLOPER_POOL_SIZE = int(environ.get("GALLOPER_POOL_SIZE", 10))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class GalloperClient(object):
+    """
+    Galloper API client on top of a keep-alive connection pool.
+
+    Auth headers are set once on the session, every call goes with the configured timeouts and
+    is retried with backoff on connection errors, 429 and 5xx. Per-call latency is kept in `metrics`.
+    JSON responses requested with `cache=True` are memoized by path and params until `latency_summary(reset=True)`
+    closes the invocation.
+    """
+
+    def __init__(self, galloper_url, token, timeout=None, retries=None, backoff=None, pool_size=None):
+        self.galloper_url = (galloper_url or "").rstrip("/")
+        self.timeout = timeout or (GALLOPER_CONNECT_TIMEOUT, GALLOPER_READ_TIMEOUT)
+        self.metrics = []
+        self.cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+
+        retry = Retry(total=GALLOPER_RETRIES if retries is None else retries,
+                      backoff_factor=GALLOPER_BACKOFF if backoff is None else backoff,
+                      status_forcelist=RETRY_STATUSES, raise_on_status=False)
+        pool_size = pool_size or GALLOPER_POOL_SIZE
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({'Content-type': 'application/json'})
+        if token:
+            self.session.headers.update({'Authorization': f'bearer {token}'})
+
+    def get(self, path, **kwargs):
+        """GET `path` relative to galloper_url (e.g. /api/v1/...), returns the response as is."""
+        url = f"{self.galloper_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        start = perf_counter()
+        status = None
+        try:
+            response = self.session.get(url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            with self._lock:
+                self.metrics.append({"path": path.split("?", 1)[0], "status": status,
+                                     "elapsed": perf_counter() - start})
+
+    def get_json(self, path, cache=False, **kwargs):
+        key = (path, tuple(sorted((kwargs.get("params") or {}).items())))
+        if cache:
+            with self._lock:
+                if key in self.cache:
+                    self.cache_hits += 1
+                    return deepcopy(self.cache[key])
+                self.cache_misses += 1
+        response = self.get(path, **kwargs)
+        response.raise_for_status()
+        data = response.json()
+        if cache:
+            with self._lock:
+                self.cache[key] = deepcopy(data)
+        return data
+
+    def latency_summary(self, reset=False):
+        """
+        Number of calls, errors, total/max latency in seconds and cache hits/misses so far.
+        With reset=True metrics and cached responses are dropped, so the next invocation starts clean.
+        """
+        with self._lock:
+            elapsed = [metric["elapsed"] for metric in self.metrics]
+            errors = sum(1 for metric in self.metrics if metric["status"] is None or metric["status"] >= 400)
+            summary = {"calls": len(elapsed), "errors": errors,
+                       "total": round(sum(elapsed), 3), "max": round(max(elapsed), 3) if elapsed else 0,
+                       "cache_hits": self.cache_hits, "cache_misses": self.cache_misses}
+            if reset:
+                self.metrics, self.cache = [], {}
+                self.cache_hits = self.cache_misses = 0
+        return summary
+
+    def close(self):
+        self.session.close()
+
+
+def get_galloper_client(galloper_url, token):
+    """
+    Shared client per Galloper url and token, so all modules reuse one connection pool.
+    Kept in the resource registry, so warm invocations reuse it as well.
+    """
+    galloper_url = (galloper_url or "").rstrip("/")
+    return registry.get("galloper", credential_key(galloper_url, token),
+                        lambda: GalloperClient(galloper_url, token), close=GalloperClient.close)
+
+
+def latency_summaries(reset=True):
+    """Latency and cache summary of every shared client used in this invocation, by Galloper url."""
+    return {client.galloper_url: client.latency_summary(reset=reset) for client in registry.resources("galloper")
+            if client.metrics or client.cache_hits}
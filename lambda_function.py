@@ -13,22 +13,83 @@
 # limitations under the License.
 
 import json
+from concurrent.futures import ThreadPoolExecutor
 from os import environ
+from queue import Queue
 from email_client import EmailClient
-from api_email_notification import ApiEmailNotification
-from ui_email_notification import UIEmailNotification
+from mail_spool import MAIL_SPOOL_DIR, MailSpool
+from galloper_client import latency_summaries
+from resource_registry import batch_slot
 from time import sleep
 from typing import Union
 import ast
 
+# events of a batch (list event) processed concurrently
+BATCH_WORKERS = int(environ.get("BATCH_WORKERS", 4))
+
 
 def lambda_handler(event: Union[list, dict], context):
+    try:
+        if isinstance(event, list) and len(event) > 1:
+            return process_batch(event)
+        return process_event(event)
+    finally:
+        print(f"Galloper API calls: {latency_summaries()}")
+
+
+def process_batch(events: list):
+    """
+    Process every event of the list, up to BATCH_WORKERS at a time. Events share the clients of the
+    resource registry, every worker uses its own registry slot for connections that are not thread safe.
+    Returns per-event statuses, 207 when some of the events failed.
+    """
+    workers = min(BATCH_WORKERS, len(events))
+    slots = Queue()
+    for slot in range(workers):
+        slots.put(slot)
+
+    def run(event):
+        slot = slots.get()
+        try:
+            with batch_slot(slot):
+                return process_event(event)
+        finally:
+            slots.put(slot)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        responses = list(pool.map(run, events))
+    statuses = [{'index': index, 'statusCode': response['statusCode'], 'body': json.loads(response['body'])}
+                for index, response in enumerate(responses)]
+    return {
+        'statusCode': 200 if all(status['statusCode'] == 200 for status in statuses) else 207,
+        'body': json.dumps(statuses)
+    }
+
+
+def process_event(event: Union[list, dict]):
     try:
         args = parse_args(event)
         print(args)
         if not args['notification_type']:
             raise Exception('notification_type parameter is not passed')
 
+        spool = None
+        if MAIL_SPOOL_DIR:
+            try:
+                spool = MailSpool()
+            except OSError as e:
+                # e.g. /tmp is full, the email is still delivered, just not spooled
+                print(f"Mail spool {MAIL_SPOOL_DIR} is not available: {e}")
+        if args['notification_type'] == 'spool':
+            # retry emails left in the spool by previous invocations, no report is generated
+            if not spool:
+                raise Exception('Mail spool is not available, check MAIL_SPOOL_DIR')
+            reports = EmailClient(args).resume(spool)
+            return {
+                'statusCode': 200,
+                'body': json.dumps(reports)
+            }
+
         # Send notification
         if args['notification_type'] == 'api':
             # Check required params
@@ -36,17 +97,20 @@ def lambda_handler(event: Union[list, dict], context):
                         args['notification_type'], args['smtp_password'], args['user_list']]):
                 raise Exception('Some required parameters not passed')
 
+            # notification paths are imported on demand, so a cold start only loads the one it runs
+            from api_email_notification import ApiEmailNotification
             email = ApiEmailNotification(args).api_email_notification()
         elif args['notification_type'] == 'ui':
             if not all([args['test_id'], args['report_id']]):
                 raise Exception('test_id and report_id are required for UI reports')
 
+            from ui_email_notification import UIEmailNotification
             email = UIEmailNotification(args).ui_email_notification()
         else:
             raise Exception('Incorrect value for notification_type: {}. Must be api or ui'
                             .format(args['notification_type']))
 
-        EmailClient(args).send_email(email)
+        EmailClient(args).send_email(email, spool=spool)
 
     except Exception as e:
         from traceback import format_exc
@@ -101,12 +165,12 @@ def parse_args(event: Union[list, dict]):
         args['notification_type'] = event.get('notification_type')
     if args['notification_type'] == 'ui':
         args['test_type'] = event.get('test_suite')
-    if args['notification_type'] == 'api':
+    if args['notification_type'] in ['api', 'spool']:
         args['test_type'] = event.get('test_type')
 
     args['type'] = args['test_type']
 
-    if args['notification_type'] == "api":
+    if args['notification_type'] in ["api", "spool"]:
         args['smtp_password'] = event.get("smtp_password")
     else:
         args['smtp_password'] = event.get('smtp_password')["value"]
@@ -190,6 +254,19 @@ def parse_args(event: Union[list, dict]):
     args['azure_openai_api_version'] = event.get('azure_openai_api_version', '2024-02-15-preview')
     args['ai_model'] = event.get('ai_model', 'gpt-4o')
     args['ai_temperature'] = event.get('ai_temperature', 0.0)
+    # overall seconds for the concurrent AI analysis calls, results not ready by then are left out
+    args['ai_time_budget'] = float(event.get('ai_time_budget', environ.get('AI_TIME_BUDGET', 90)))
+    if args['ai_time_budget'] <= 0:
+        args['enable_ai_analysis'] = False
+
+    # Charts: "matplotlib" (PNG) or "svg" (no matplotlib import)
+    args['chart_backend'] = event.get('chart_backend', environ.get('CHART_BACKEND', 'matplotlib'))
+    # PNG rendering profile: "classic", "email", "retina" or "archive" (see chart_generator.RENDER_PROFILES)
+    args['chart_profile'] = event.get('chart_profile', environ.get('CHART_PROFILE', 'classic'))
+    # "individual" - one message per recipient, "bcc" - one message with all recipients in the envelope
+    args['email_send_mode'] = event.get('email_send_mode', environ.get('EMAIL_SEND_MODE', 'individual'))
+    # parallel SMTP connections for "individual" mode
+    args['smtp_pool_size'] = event.get('smtp_pool_size', environ.get('SMTP_POOL_SIZE', 4))
 
     return args
 
@@ -0,0 +1,136 @@
+# Copyright 2019 getcarrier.io
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from os import environ, makedirs, path
+
+logger = logging.getLogger(__name__)
+
+
+# SQLite file with AI provider responses, empty - disabled
+LLM_CACHE_PATH = environ.get("LLM_CACHE_PATH", "/tmp/llm_cache/responses.sqlite3")
+# seconds a response is served from the cache
+LLM_CACHE_TTL = float(environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(environ.get("LLM_CACHE_MAX_BYTES", 20 * 1024 * 1024))
+
+
+def normalize_prompt(prompt):
+    """Prompt without trailing spaces and runs of blank lines, which do not change the answer."""
+    lines = [line.rstrip() for line in prompt.strip().splitlines()]
+    return "\n".join(line for index, line in enumerate(lines) if line or lines[index - 1])
+
+
+def llm_cache_key(model, temperature, system_prompt, user_prompt, max_tokens=None):
+    """Address of a response: model, sampling settings, system prompt and hash of the normalized user prompt."""
+    prompt_hash = hashlib.sha256(normalize_prompt(user_prompt).encode("utf-8")).hexdigest()
+    payload = json.dumps({"model": model, "temperature": float(temperature), "max_tokens": max_tokens,
+                          "system": system_prompt, "prompt": prompt_hash}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache(object):
+    """
+    AI provider responses by `llm_cache_key`, kept in a SQLite file.
+    Only deterministic calls (temperature 0) are stored, see AzureOpenAIProvider._complete.
+
+    Responses older than `ttl` are not served, least recently used ones are evicted once the
+    responses grow over `max_bytes`. The cache never fails a call: a broken store is a miss.
+    """
+
+    def __init__(self, db_path=None, ttl=None, max_bytes=None):
+        self.db_path = LLM_CACHE_PATH if db_path is None else db_path
+        self.ttl = LLM_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = max_bytes or LLM_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @property
+    def enabled(self):
+        return bool(self.db_path)
+
+    def get(self, key):
+        """Cached response content or None."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT content, tokens FROM responses WHERE key = ? AND created > ?",
+                                 (key, now - self.ttl)).fetchone()
+                if row is not None:
+                    db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"[LLMCache] Could not read response cache: {e}")
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.saved_tokens += row[1]
+            logger.info(f"[LLMCache] {'hit' if row else 'miss'}, {self.hits} hits, {self.misses} misses, "
+                        f"{self.saved_tokens} tokens saved")
+        return row[0] if row else None
+
+    def put(self, key, content, tokens=0):
+        if not self.enabled or not content or len(content.encode("utf-8")) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._connect() as db:
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                           (key, content, tokens or 0, len(content.encode("utf-8")), now, now))
+                self._evict(db, now)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"[LLMCache] Could not write response cache: {e}")
+
+    def clear(self):
+        if self.enabled:
+            with self._connect() as db:
+                db.execute("DELETE FROM responses")
+        with self._lock:
+            self.hits = self.misses = self.saved_tokens = 0
+
+    @contextmanager
+    def _connect(self):
+        # a connection per operation, AI calls of one report run in parallel threads
+        if not self._ready and path.dirname(self.db_path):
+            makedirs(path.dirname(self.db_path), exist_ok=True)
+        db = sqlite3.connect(self.db_path, timeout=10)
+        with closing(db), db:
+            if not self._ready:
+                db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT, "
+                           "tokens INTEGER, size INTEGER, created REAL, last_used REAL)")
+                self._ready = True
+            yield db
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+        total = 0
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_used DESC").fetchall():
+            total += size
+            if total > self.max_bytes:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+
+llm_cache = LLMCache()
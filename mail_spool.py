@@ -0,0 +1,158 @@
+# Copyright 2019 getcarrier.io
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import time
+import uuid
+from os import environ
+
+
+# spool directory for rendered emails waiting for delivery, empty - disabled. Lambda /tmp is lost with the
+# container, use a mounted file system (EFS) and drain it with scheduled "spool" notifications
+MAIL_SPOOL_DIR = environ.get("MAIL_SPOOL_DIR", "")
+# delivery attempts per email, the n-th retry waits MAIL_SPOOL_BACKOFF * 2 ** (n - 1) seconds
+MAIL_SPOOL_MAX_ATTEMPTS = int(environ.get("MAIL_SPOOL_MAX_ATTEMPTS", 5))
+MAIL_SPOOL_BACKOFF = float(environ.get("MAIL_SPOOL_BACKOFF", 60))
+# a claimed email is given back to the spool after this many seconds (Lambda runs at most 15 minutes)
+MAIL_SPOOL_LOCK_TIMEOUT = float(environ.get("MAIL_SPOOL_LOCK_TIMEOUT", 900))
+# seconds an email that ran out of attempts is kept in the spool for inspection
+MAIL_SPOOL_FAILED_TTL = float(environ.get("MAIL_SPOOL_FAILED_TTL", 24 * 3600))
+
+MESSAGE_FILE = "message.eml"
+STATE_FILE = "state.json"
+LOCK_FILE = "lock"
+
+
+class MailSpool(object):
+    """
+    Directory of serialized emails waiting for delivery, one sub directory per email.
+
+    Every email keeps the message without the To header (see EmailClient.build_message) and a state
+    with the recipients it was not delivered to yet. Failed recipients are retried with exponential
+    backoff until MAIL_SPOOL_MAX_ATTEMPTS, then the email stays in the spool with status "failed"
+    for `failed_ttl` seconds. SMTP credentials are never written to the spool, every email keeps
+    the `account` (a credential_key of the SMTP host, port and user) it was spooled by, and is only
+    retried with the same account.
+    """
+
+    def __init__(self, directory=None, max_attempts=None, backoff=None, failed_ttl=None):
+        self.directory = MAIL_SPOOL_DIR if directory is None else directory
+        self.max_attempts = max_attempts or MAIL_SPOOL_MAX_ATTEMPTS
+        self.backoff = MAIL_SPOOL_BACKOFF if backoff is None else backoff
+        self.failed_ttl = MAIL_SPOOL_FAILED_TTL if failed_ttl is None else failed_ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, entry_id, name=""):
+        return os.path.join(self.directory, entry_id, name)
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, message, recipients, send_mode, subject="", account=None):
+        """Spool a serialized message for `recipients` and claim it for the first delivery."""
+        self.expire()
+        entry_id = f"{int(time.time())}-{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._path(entry_id))
+        self._write(self._path(entry_id, MESSAGE_FILE), message)
+        self._write_state(entry_id, {"subject": subject, "send_mode": send_mode, "account": account,
+                                     "pending": list(recipients), "errors": {}, "attempts": 0, "next_attempt": 0,
+                                     "status": "pending"})
+        self.claim(entry_id)
+        return entry_id
+
+    def _write_state(self, entry_id, state):
+        self._write(self._path(entry_id, STATE_FILE), json.dumps(state, indent=2))
+
+    def state(self, entry_id):
+        with open(self._path(entry_id, STATE_FILE)) as f:
+            return json.load(f)
+
+    def message(self, entry_id):
+        with open(self._path(entry_id, MESSAGE_FILE)) as f:
+            return f.read()
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.isfile(self._path(name, STATE_FILE)))
+
+    def due(self, now=None, account=None):
+        """Pending emails of the SMTP `account` whose next attempt is due."""
+        now = time.time() if now is None else now
+        self.expire(now)
+        due = []
+        for entry_id in self.entries():
+            try:
+                state = self.state(entry_id)
+            except (OSError, ValueError):
+                continue
+            if state["status"] == "pending" and state["next_attempt"] <= now and state.get("account") == account:
+                due.append(entry_id)
+        return due
+
+    def expire(self, now=None):
+        """Remove failed emails older than `failed_ttl`."""
+        now = time.time() if now is None else now
+        for entry_id in self.entries():
+            try:
+                state = self.state(entry_id)
+                if state["status"] == "failed" and state.get("failed_at", 0) + self.failed_ttl <= now:
+                    self.remove(entry_id)
+            except (OSError, ValueError):
+                # removed by a concurrent invocation
+                continue
+
+    def claim(self, entry_id):
+        """Take the email for delivery, False when another invocation is delivering it."""
+        lock = self._path(entry_id, LOCK_FILE)
+        try:
+            if time.time() - os.path.getmtime(lock) > MAIL_SPOOL_LOCK_TIMEOUT:
+                os.remove(lock)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def record(self, entry_id, report, sent_status="sent"):
+        """
+        Record the delivery report of an attempt and release the email. Delivered emails are removed
+        from the spool, the others are scheduled for the next attempt. Returns the new state.
+        """
+        state = self.state(entry_id)
+        state["attempts"] += 1
+        state["pending"] = [recipient for recipient in state["pending"] if report.get(recipient) != sent_status]
+        state["errors"] = {recipient: report[recipient] for recipient in state["pending"] if recipient in report}
+        if not state["pending"]:
+            state["status"] = "sent"
+            self.remove(entry_id)
+            return state
+        if state["attempts"] >= self.max_attempts:
+            state["status"] = "failed"
+            state["failed_at"] = time.time()
+        else:
+            state["next_attempt"] = time.time() + self.backoff * 2 ** (state["attempts"] - 1)
+        self._write_state(entry_id, state)
+        os.remove(self._path(entry_id, LOCK_FILE))
+        return state
+
+    def remove(self, entry_id):
+        for name in os.listdir(self._path(entry_id)):
+            os.remove(self._path(entry_id, name))
+        os.rmdir(self._path(entry_id))
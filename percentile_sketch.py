@@ -0,0 +1,91 @@
+# Copyright 2019 getcarrier.io
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import numpy as np
+
+
+class PercentileSketch(object):
+    """
+    Mergeable streaming quantile sketch with relative accuracy guarantee (DDSketch style).
+
+    Values are counted in logarithmic buckets, so memory depends on the value range,
+    not on the number of samples. Any percentile is returned within `relative_accuracy`
+    of the exact value; count, min, max and mean are exact.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be between 0 and 1, got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, values):
+        """Add a batch of non-negative values (any array-like)."""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        self.sum += float(values.sum())
+        batch_min, batch_max = float(values.min()), float(values.max())
+        self.min = batch_min if self.min is None else min(self.min, batch_min)
+        self.max = batch_max if self.max is None else max(self.max, batch_max)
+
+        positive = values[values > 0]
+        self.zero_count += int(values.size - positive.size)
+        if positive.size:
+            indexes = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+            for index, count in zip(*np.unique(indexes, return_counts=True)):
+                self.bins[int(index)] = self.bins.get(int(index), 0) + int(count)
+
+    def merge(self, other):
+        """Merge another sketch with the same accuracy into this one."""
+        if other.gamma != self.gamma:
+            raise ValueError("Can not merge sketches with different relative accuracy")
+        if not other.count:
+            return self
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, pct):
+        """Approximate percentile (0-100) using the same rank as np.percentile."""
+        if not self.count:
+            raise ValueError("Can not calculate percentile of an empty sketch")
+        rank = math.floor(pct / 100.0 * (self.count - 1))
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
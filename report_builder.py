@@ -31,18 +31,47 @@ import time
 import calendar
 import datetime
 import pytz
-import requests
-from chart_generator import alerts_linechart, barchart, ui_comparison_linechart
-from email.mime.image import MIMEImage
+from concurrent.futures import ThreadPoolExecutor, wait
+from os import environ
+from galloper_client import get_galloper_client
+from chart_renderer import chart_images
 import statistics
-from jinja2 import Environment, FileSystemLoader
-import markdown
-from ai_analyzer import AIProviderFactory
+from template_registry import get_template, template_filter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# overall time budget in seconds for the AI analysis calls of one email
+AI_TIME_BUDGET = float(environ.get("AI_TIME_BUDGET", 90))
 
+
+def run_within_budget(calls, budget):
+    """
+    Run the `calls` ({name: callable}) concurrently and return {name: result} of the calls that succeeded
+    within `budget` seconds. Failed calls are logged and returned as None, calls still running when the
+    budget is over are left to finish in the background and are missing from the result.
+    A budget of 0 or less runs nothing.
+    """
+    if budget <= 0:
+        logger.info("[ReportBuilder] AI time budget is 0, AI analysis is skipped")
+        return {}
+    pool = ThreadPoolExecutor(max_workers=max(len(calls), 1))
+    futures = {pool.submit(call): name for name, call in calls.items()}
+    done, not_done = wait(futures, timeout=budget)
+    pool.shutdown(wait=False)
+    results = {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            logger.warning(f"[ReportBuilder] AI {futures[future]} analysis failed: {type(e).__name__}: {e}")
+            results[futures[future]] = None
+    for future in not_done:
+        logger.warning(f"[ReportBuilder] AI {futures[future]} analysis did not finish within {budget}s budget")
+    return results
+
+
+@template_filter
 def markdown_to_html(text: str) -> str:
     """
     Convert markdown to HTML for email rendering.
@@ -65,6 +94,8 @@ def markdown_to_html(text: str) -> str:
     if not text:
         return ""
 
+    import markdown
+
     # Convert markdown to HTML (safe by default - no raw HTML)
     html = markdown.markdown(
         text,
@@ -80,6 +111,47 @@ def markdown_to_html(text: str) -> str:
     return html
 
 
+@template_filter
+def format_number(value):
+    """Format number with thousand separators and max 2 decimal places"""
+    if value in ['N/A', '', None]:
+        return value
+    try:
+        # Convert to float
+        num = float(value)
+        # Format with 2 decimal places and thousand separators (comma)
+        formatted = "{:,.2f}".format(num)
+        # Remove trailing zeros after decimal point
+        if '.' in formatted:
+            formatted = formatted.rstrip('0').rstrip('.')
+        return formatted
+    except (ValueError, TypeError):
+        return value
+
+
+@template_filter
+def format_failed_reason(reason):
+    """Replace incorrect % units with proper units based on metric type and improve wording"""
+    import re
+    
+    # First, fix the units
+    # Check if it's throughput
+    if 'throughput' in reason.lower():
+        # Replace "- X%" or "- X %" with "- X req/sec"
+        reason = re.sub(r'(\s*-\s*[\d.]+)\s*%', r'\1 req/sec', reason)
+    # Check if it's response_time
+    elif 'response_time' in reason.lower() or 'response time' in reason.lower():
+        # Replace "- X%" or "- X %" with "- X sec"
+        reason = re.sub(r'(\s*-\s*[\d.]+)\s*%', r'\1 sec', reason)
+    # error_rate keeps % (don't change)
+    
+    # Second, fix "exceeded" wording - make it more generic
+    # "exceeded SLA value" -> "violated SLA threshold"
+    reason = reason.replace('exceeded SLA value', 'violated SLA threshold')
+    
+    return reason
+
+
 def _detect_baseline_degradations(performance_context, baseline_data):
     """
     Analyze baseline comparison and detect degradations.
@@ -675,10 +747,9 @@ class ReportBuilder:
         Get API reports from Galloper.
         Return total, rows, start_time, end_time from reports.
         """
-        url = f"{galloper_url}/api/v1/backend_performance/reports/{galloper_project_id}?name={name}&limit={limit}"
-        headers = {"Authorization": f"Bearer {token}"}
+        url = f"/api/v1/backend_performance/reports/{galloper_project_id}?name={name}&limit={limit}"
         
-        response = requests.get(url, headers=headers)
+        response = get_galloper_client(galloper_url, token).get(url)
         response.raise_for_status()
         data = response.json()
         total = data.get("total", 0)
@@ -707,9 +778,8 @@ class ReportBuilder:
                 return None
             
             # Fetch all reports to find the one with matching build_id
-            url = f"{galloper_url}/api/v1/backend_performance/reports/{project_id}?name={test_name}&limit=100"
-            headers = {"Authorization": f"Bearer {token}"}
-            response = requests.get(url, headers=headers)
+            url = f"/api/v1/backend_performance/reports/{project_id}?name={test_name}&limit=100"
+            response = get_galloper_client(galloper_url, token).get(url)
             response.raise_for_status()
             data = response.json()
             rows = data.get("rows", [])
@@ -777,7 +847,7 @@ class ReportBuilder:
             return {}
 
     def create_api_email_body(self, args, tests_data, last_test_data, baseline, comparison_metric,
-                              violation, thresholds=None, report_data=None):
+                              violation, thresholds=None, report_data=None, context=None):
         # Smart metric selection: if comparison_metric is default (pct95) and Per request results is not enabled,
         # but SLA is configured with different metrics, auto-select the metric from SLA
         per_request_results_config = args.get("quality_gate_config", {}).get("settings", {}).get("per_request_results", {})
@@ -1204,11 +1274,16 @@ class ReportBuilder:
                 if build_id:
                     build_ids_to_fetch.append(build_id)
         
-        # Fetch API reports to get start_time for historical tests
-        api_reports = self.fetch_api_reports_for_comparison(args, build_ids=build_ids_to_fetch)
+        # Fetch API reports to get start_time for historical tests (unless prefetched into the context)
+        if context is not None and context.api_reports is not None:
+            api_reports = context.api_reports
+        else:
+            api_reports = self.fetch_api_reports_for_comparison(args, build_ids=build_ids_to_fetch)
         builds_comparison = self.create_builds_comparison(tests_data, args, api_reports, comparison_metric)
         general_metrics = self.get_general_metrics(args, builds_comparison[0], baseline, thresholds, comparison_metric)
-        charts = self.create_charts(builds_comparison, last_test_data, baseline, comparison_metric)
+        charts = self.create_charts(builds_comparison, last_test_data, baseline, comparison_metric,
+                                    chart_backend=args.get('chart_backend'),
+                                    chart_profile=args.get('chart_profile'))
         baseline_and_thresholds = baseline_and_thresholds_temp
 
         # test_description now contains all warnings generated above
@@ -1226,7 +1301,8 @@ class ReportBuilder:
         email_body = self.get_ui_email_body(test_params, top_five_thresholds, builds_comparison, last_test_data)
         return email_body, charts, str(test_params['start_time']).split(" ")[0]
 
-    def create_test_description(self, args, test, baseline, comparison_metric, violation, report_data=None):
+    def create_test_description(self, args, test, baseline, comparison_metric, violation, report_data=None,
+                                context=None):
         params = ['simulation', 'users', 'duration']
         test_params = {"test_type": args["test_type"], "env": args["env"],
                        "performance_degradation_rate": args["performance_degradation_rate"],
@@ -1240,8 +1316,11 @@ class ReportBuilder:
         # Add baseline report URL if baseline exists and has build_id
         if baseline and len(baseline) > 0 and baseline[0].get("build_id"):
             baseline_build_id = baseline[0]["build_id"]
-            # Get report_id for baseline from API
-            baseline_report_id = self._get_baseline_api_report_id(args, baseline_build_id)
+            # Get report_id for baseline from API (unless prefetched into the context)
+            if context is not None and context.baseline_report_fetched:
+                baseline_report_id = context.baseline_report_id
+            else:
+                baseline_report_id = self._get_baseline_api_report_id(args, baseline_build_id)
             if baseline_report_id:
                 test_params["baseline_report_url"] = f"{args['galloper_url']}/-/performance/backend/results?result_id={baseline_report_id}"
         if report_data:
@@ -1515,16 +1594,17 @@ class ReportBuilder:
             build_info[param] = build[param]
         return build_info
 
-    def create_charts(self, builds, last_test_data, baseline, comparison_metric):
+    def create_charts(self, builds, last_test_data, baseline, comparison_metric, chart_backend=None,
+                      chart_profile=None):
         charts = []
         if len(builds) >= 1:
-            charts.append(self.create_success_rate_chart(builds))
-            charts.append(self.create_throughput_chart(builds))
-            charts.append(self.create_response_time_chart(builds, comparison_metric))
+            charts.extend(chart_images([self.success_rate_chart_spec(builds), self.throughput_chart_spec(builds),
+                                        self.response_time_chart_spec(builds, comparison_metric)],
+                                       backend=chart_backend, profile=chart_profile))
         return charts
 
     @staticmethod
-    def create_success_rate_chart(builds):
+    def success_rate_chart_spec(builds):
         labels, keys, values = [], [], []
         count = 1
         for test in builds:
@@ -1539,20 +1619,18 @@ class ReportBuilder:
             'y_axis': 'Successful requests, %',
             'width': 10,
             'height': 2,
-            'path_to_save': '/tmp/success_rate.png',
             'keys': keys[::-1],
             'values': values,
             'labels': labels[::-1]
         }
-        alerts_linechart(datapoints)
-        fp = open('/tmp/success_rate.png', 'rb')
-        image = MIMEImage(fp.read())
-        image.add_header('Content-ID', '<success_rate>')
-        fp.close()
-        return image
+        return 'alerts_linechart', datapoints, '<success_rate>'
 
     @staticmethod
-    def create_throughput_chart(builds):
+    def create_success_rate_chart(builds):
+        return chart_images([ReportBuilder.success_rate_chart_spec(builds)])[0]
+
+    @staticmethod
+    def throughput_chart_spec(builds):
         labels, keys, values = [], [], []
         count = 1
         for test in builds:
@@ -1567,20 +1645,18 @@ class ReportBuilder:
             'y_axis': 'Throughput, req/s',
             'width': 10,
             'height': 2,
-            'path_to_save': '/tmp/throughput.png',
             'keys': keys[::-1],
             'values': values,
             'labels': labels[::-1]
         }
-        alerts_linechart(datapoints)
-        fp = open('/tmp/throughput.png', 'rb')
-        image = MIMEImage(fp.read())
-        image.add_header('Content-ID', '<throughput>')
-        fp.close()
-        return image
+        return 'alerts_linechart', datapoints, '<throughput>'
 
     @staticmethod
-    def create_response_time_chart(builds, metric_name='pct95'):
+    def create_throughput_chart(builds):
+        return chart_images([ReportBuilder.throughput_chart_spec(builds)])[0]
+
+    @staticmethod
+    def response_time_chart_spec(builds, metric_name='pct95'):
         labels, keys, values = [], [], []
         count = 1
         for test in builds:
@@ -1595,17 +1671,15 @@ class ReportBuilder:
             'y_axis': 'Response Time, sec',
             'width': 10,
             'height': 2,
-            'path_to_save': '/tmp/response_time.png',
             'keys': keys[::-1],
             'values': values,
             'labels': labels[::-1]
         }
-        alerts_linechart(datapoints)
-        fp = open('/tmp/response_time.png', 'rb')
-        image = MIMEImage(fp.read())
-        image.add_header('Content-ID', '<response_time>')
-        fp.close()
-        return image
+        return 'alerts_linechart', datapoints, '<response_time>'
+
+    @staticmethod
+    def create_response_time_chart(builds, metric_name='pct95'):
+        return chart_images([ReportBuilder.response_time_chart_spec(builds, metric_name)])[0]
 
     @staticmethod
     def create_comparison_vs_baseline_barchart(last_test_data, baseline, comparison_metric):
@@ -1650,14 +1724,8 @@ class ReportBuilder:
                       "utility_request_name": utility_request_name,
                       'width': 8,
                       'height': 4.5,
-                      "x_axis": "Requests", "y_axis": "Time, s", "title": "Comparison vs Baseline",
-                      "path_to_save": "/tmp/baseline.png"}
-        barchart(datapoints)
-        fp = open('/tmp/baseline.png', 'rb')
-        image = MIMEImage(fp.read())
-        image.add_header('Content-ID', '<baseline>')
-        fp.close()
-        return image
+                      "x_axis": "Requests", "y_axis": "Time, s", "title": "Comparison vs Baseline"}
+        return chart_images([('barchart', datapoints, '<baseline>')])[0]
 
     @staticmethod
     def create_thresholds_chart(last_test_data, comparison_metric):
@@ -1709,14 +1777,8 @@ class ReportBuilder:
                       "utility_request_name": utility_request_name,
                       'width': 8,
                       'height': 4.5,
-                      "x_axis": "Requests", "y_axis": "Time, s", "title": "Comparison vs Thresholds",
-                      "path_to_save": "/tmp/thresholds.png"}
-        barchart(datapoints)
-        fp = open('/tmp/thresholds.png', 'rb')
-        image = MIMEImage(fp.read())
-        image.add_header('Content-ID', '<thresholds>')
-        fp.close()
-        return image
+                      "x_axis": "Requests", "y_axis": "Time, s", "title": "Comparison vs Thresholds"}
+        return chart_images([('barchart', datapoints, '<thresholds>')])[0]
 
     def create_ui_charts(self, test, builds_comparison):
         charts = [self.create_thresholds_chart(test, 'time')]
@@ -1747,7 +1809,6 @@ class ReportBuilder:
             'y_axis': 'Time, sec',
             'width': 10,
             'height': 3,
-            'path_to_save': '/tmp/comparison.png',
             'keys': keys,
             'latency_values': latency_values[::-1],
             'transfer_values': transfer_values[::-1],
@@ -1756,12 +1817,7 @@ class ReportBuilder:
             'total_time_values': total_time_values[::-1],
             'labels': labels[::-1]
         }
-        ui_comparison_linechart(datapoints)
-        fp = open('/tmp/comparison.png', 'rb')
-        image = MIMEImage(fp.read())
-        image.add_header('Content-ID', '<comparison>')
-        fp.close()
-        return image
+        return chart_images([('ui_comparison_linechart', datapoints, '<comparison>')])[0]
 
     @staticmethod
     def get_general_metrics(args, build_data, baseline, thresholds=None, comparison_metric='pct95'):
@@ -2005,12 +2061,10 @@ class ReportBuilder:
             token = args.get('token')
             
             if galloper_url and project_id and simulation:
-                import requests
-                headers = {'Authorization': f'bearer {token}'} if token else {}
-                thresholds_url = f"{galloper_url}/api/v1/backend_performance/thresholds/{project_id}?" \
+                thresholds_url = f"/api/v1/backend_performance/thresholds/{project_id}?" \
                                 f"test={simulation}&env={env}&order=asc"
-                all_thresholds_for_baseline = requests.get(thresholds_url, 
-                    headers={**headers, 'Content-type': 'application/json'}).json()
+                all_thresholds_for_baseline = get_galloper_client(galloper_url, token).get_json(
+                    thresholds_url, cache=True)
         except Exception as e:
             print(f"Warning: Could not fetch unfiltered thresholds for baseline: {e}")
             all_thresholds_for_baseline = []
@@ -2520,48 +2574,7 @@ class ReportBuilder:
 
     def get_api_email_body(self, args, test_params, last_test_data, baseline, builds_comparison, baseline_and_thresholds,
                            general_metrics, comparison_metric='pct95', thresholds=None):
-        def format_number(value):
-            """Format number with thousand separators and max 2 decimal places"""
-            if value in ['N/A', '', None]:
-                return value
-            try:
-                # Convert to float
-                num = float(value)
-                # Format with 2 decimal places and thousand separators (comma)
-                formatted = "{:,.2f}".format(num)
-                # Remove trailing zeros after decimal point
-                if '.' in formatted:
-                    formatted = formatted.rstrip('0').rstrip('.')
-                return formatted
-            except (ValueError, TypeError):
-                return value
-        
-        def format_failed_reason(reason):
-            """Replace incorrect % units with proper units based on metric type and improve wording"""
-            import re
-            
-            # First, fix the units
-            # Check if it's throughput
-            if 'throughput' in reason.lower():
-                # Replace "- X%" or "- X %" with "- X req/sec"
-                reason = re.sub(r'(\s*-\s*[\d.]+)\s*%', r'\1 req/sec', reason)
-            # Check if it's response_time
-            elif 'response_time' in reason.lower() or 'response time' in reason.lower():
-                # Replace "- X%" or "- X %" with "- X sec"
-                reason = re.sub(r'(\s*-\s*[\d.]+)\s*%', r'\1 sec', reason)
-            # error_rate keeps % (don't change)
-            
-            # Second, fix "exceeded" wording - make it more generic
-            # "exceeded SLA value" -> "violated SLA threshold"
-            reason = reason.replace('exceeded SLA value', 'violated SLA threshold')
-            
-            return reason
-        
-        env = Environment(loader=FileSystemLoader('./templates/'))
-        env.filters['format_number'] = format_number
-        env.filters['format_failed_reason'] = format_failed_reason
-        env.filters['markdown_to_html'] = markdown_to_html
-        template = env.get_template("backend_email_template.html")
+        template = get_template("backend_email_template.html")
         last_test_data = self.reprocess_test_data(last_test_data, ['total', 'throughput'])
         
         # Check if Baseline is actually enabled and has required settings
@@ -2667,39 +2680,30 @@ class ReportBuilder:
                     'temperature': args.get('ai_temperature', 0.0)
                 }
 
+                # the openai SDK is only imported when AI analysis is enabled
+                from ai_analyzer import AIProviderFactory
                 provider = AIProviderFactory.create_provider(provider_config)
 
-                # Generate single comprehensive analysis (with both violations and baseline degradations)
-                analysis_content = provider.generate_analysis(performance_context, violations, baseline_degradations)
-
-                ai_analysis = {
-                    'summary': analysis_content  # Single field for comprehensive analysis
-                }
-
-                logger.info(f"[ReportBuilder] AI analysis completed: {len(analysis_content) if analysis_content else 0} chars")
-
-                # Trend analysis integration (T017-T021)
+                # Comprehensive analysis and trend analysis are independent: both run concurrently under
+                # one time budget, whatever finished within the budget goes into the email
+                calls = {'summary': lambda: provider.generate_analysis(performance_context, violations,
+                                                                       baseline_degradations)}
                 if len(builds_comparison) >= 2:
-                    try:
-                        logger.info(f"[ReportBuilder] Generating trend analysis for {len(builds_comparison)} test runs...")
-                        trend_content = provider.generate_trend_analysis(builds_comparison)
-                        if ai_analysis is None:
-                            ai_analysis = {}
-                        ai_analysis['trend'] = trend_content
-                        logger.info(f"[ReportBuilder] Trend analysis completed: {len(trend_content) if trend_content else 0} chars")
-                    except Exception as trend_error:
-                        logger.warning(f"[ReportBuilder] Trend analysis failed: {trend_error}")
-                        if ai_analysis is None:
-                            ai_analysis = {}
-                        ai_analysis['trend'] = None
+                    logger.info(f"[ReportBuilder] Generating trend analysis for {len(builds_comparison)} test runs...")
+                    calls['trend'] = lambda: provider.generate_trend_analysis(builds_comparison)
                 else:
                     logger.info(
                         f"[ReportBuilder] Skipping trend analysis: only {len(builds_comparison)} "
                         f"test(s) available (minimum 2 required)"
                     )
-                    if ai_analysis is None:
-                        ai_analysis = {}
-                    ai_analysis['trend'] = None
+                budget = args.get('ai_time_budget')
+                ai_analysis = run_within_budget(calls, AI_TIME_BUDGET if budget is None else float(budget))
+                ai_analysis.setdefault('trend', None)
+
+                summary = ai_analysis.get('summary')
+                trend = ai_analysis.get('trend')
+                logger.info(f"[ReportBuilder] AI analysis completed: {len(summary) if summary else 0} chars, "
+                            f"trend analysis: {len(trend) if trend else 0} chars")
 
             except Exception as e:
                 # Graceful degradation (FR-023): log error but continue email delivery
@@ -2744,8 +2748,7 @@ class ReportBuilder:
 
     @staticmethod
     def get_ui_email_body(test_params, top_five_thresholds, builds_comparison, last_test_data):
-        env = Environment(loader=FileSystemLoader('./templates/'))
-        template = env.get_template("ui_email_template.html")
+        template = get_template("ui_email_template.html")
         html = template.render(t_params=test_params, top_five_thresholds=top_five_thresholds,
                                comparison=builds_comparison,
                                summary=last_test_data)
@@ -0,0 +1,150 @@
+# Copyright 2019 getcarrier.io
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Process-wide registry of clients and connections reused by lambda_handler invocations of a warm container.
+
+Resources are kept by kind and key. Keys are built with `credential_key` from everything that identifies
+the tenant (url, user, token, password), so different credentials never share a resource.
+A resource idle for longer than RESOURCE_CHECK_AFTER is health checked before it is handed out again,
+one not used for RESOURCE_TTL is closed and dropped.
+
+Events of a batch run concurrently, each in its own `batch_slot`. Resources that are not thread safe
+(InfluxDB client, SMTP connections) add `current_batch_slot()` to their key.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from os import environ
+
+
+# seconds a resource may stay unused before it is closed and dropped
+RESOURCE_TTL = float(environ.get("RESOURCE_TTL", 900))
+# seconds of idling after which a resource is health checked before reuse
+RESOURCE_CHECK_AFTER = float(environ.get("RESOURCE_CHECK_AFTER", 30))
+
+
+def credential_key(*parts):
+    """Registry key of the given url/user/secret parts, secrets are not kept in clear text."""
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+_local = threading.local()
+
+
+def current_batch_slot():
+    return getattr(_local, "batch_slot", 0)
+
+
+@contextmanager
+def batch_slot(slot):
+    """Run the block in the given batch slot of the current thread."""
+    previous = current_batch_slot()
+    _local.batch_slot = slot
+    try:
+        yield slot
+    finally:
+        _local.batch_slot = previous
+
+
+class _Entry(object):
+
+    def __init__(self, resource, check, close, ttl):
+        self.resource = resource
+        self.check = check
+        self.close = close
+        self.ttl = ttl
+        self.last_used = time.monotonic()
+
+
+class ResourceRegistry(object):
+
+    def __init__(self, ttl=None, check_after=None):
+        self.ttl = RESOURCE_TTL if ttl is None else ttl
+        self.check_after = RESOURCE_CHECK_AFTER if check_after is None else check_after
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, key, factory, check=None, close=None, ttl=None):
+        """
+        Resource of `kind` for `key`, created with factory() when missing, expired or unhealthy.
+        `check(resource)` returns False or raises when the resource can not be used anymore,
+        `close(resource)` releases it on eviction.
+        """
+        self.evict_expired()
+        with self._lock:
+            entry = self._entries.get((kind, key))
+        # health checks and factories talk to servers, they run outside of the lock
+        if entry is not None and not self._healthy(entry):
+            self.discard(kind, key)
+            entry = None
+        if entry is None:
+            created = _Entry(factory(), check, close, self.ttl if ttl is None else ttl)
+            with self._lock:
+                entry = self._entries.setdefault((kind, key), created)
+            if entry is not created:
+                self._close(kind, created)
+        entry.last_used = time.monotonic()
+        return entry.resource
+
+    def _healthy(self, entry):
+        if entry.check is None or time.monotonic() - entry.last_used < self.check_after:
+            return True
+        try:
+            return entry.check(entry.resource) is not False
+        except Exception:
+            return False
+
+    def discard(self, kind, key):
+        """Close and drop a resource that turned out to be broken."""
+        with self._lock:
+            entry = self._entries.pop((kind, key), None)
+        if entry is not None:
+            self._close(kind, entry)
+
+    def resources(self, kind):
+        with self._lock:
+            return [entry.resource for (entry_kind, _), entry in self._entries.items() if entry_kind == kind]
+
+    def evict_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [(kind_key, entry) for kind_key, entry in self._entries.items()
+                       if now - entry.last_used > entry.ttl]
+            for kind_key, _ in expired:
+                del self._entries[kind_key]
+        for (kind, _), entry in expired:
+            self._close(kind, entry)
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+        for (kind, _), entry in entries:
+            self._close(kind, entry)
+
+    @staticmethod
+    def _close(kind, entry):
+        if entry.close is None:
+            return
+        try:
+            entry.close(entry.resource)
+        except Exception as e:
+            print(f"[RESOURCES] Could not close {kind}: {e}")
+
+
+registry = ResourceRegistry()
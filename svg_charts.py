@@ -0,0 +1,166 @@
+# Copyright 2019 getcarrier.io
+# Licensed under the Apache License, Version 2.0
+
+"""
+Dependency-free SVG versions of the chart_generator line and bar charts.
+
+Functions take the same datapoints dicts as chart_generator and return SVG bytes. Sizes follow
+the matplotlib figures (inches of `width`/`height` at 72 px per inch).
+
+Inline SVG images are not displayed by Gmail and Outlook desktop, emails for them need the
+default matplotlib (PNG) backend. SVG is only for mail clients that render image/svg+xml.
+"""
+
+import math
+from xml.sax.saxutils import escape
+
+YELLOW = '#FFA400'
+GRID = '#E3E3E3'
+# matplotlib default color cycle, used by the UI metric charts
+LINE_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c']
+BAR_COLORS = {'utility': 'white', 'green': 'green', 'red': 'red', 'yellow': 'orange'}
+
+PX_PER_INCH = 72
+FONT = 'font-family="DejaVu Sans, Arial, sans-serif" font-size="12"'
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 60, 20, 20, 55
+
+
+def _svg(width, height, elements):
+    body = "\n".join(elements)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+            f'viewBox="0 0 {width:.0f} {height:.0f}" {FONT}>\n'
+            f'<rect width="100%" height="100%" fill="white"/>\n{body}\n</svg>\n').encode("utf-8")
+
+
+def _text(x, y, text, anchor="middle", rotate=None, baseline=None, color="black"):
+    transform = f' transform="rotate({rotate} {x:.1f} {y:.1f})"' if rotate is not None else ""
+    dominant = f' dominant-baseline="{baseline}"' if baseline else ""
+    return (f'<text x="{x:.1f}" y="{y:.1f}" text-anchor="{anchor}" fill="{color}"{dominant}{transform}>'
+            f'{escape(str(text))}</text>')
+
+
+def _nice_step(y_max, ticks=5):
+    raw = y_max / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for multiplier in (1, 2, 2.5, 5, 10):
+        if raw <= multiplier * magnitude:
+            return multiplier * magnitude
+    return 10 * magnitude
+
+
+def _line_chart(datapoints, series, dashed=False):
+    """series: list of (label, values, color); legend is drawn when labels are given."""
+    width = datapoints['width'] * PX_PER_INCH
+    height = datapoints['height'] * 1.5 * PX_PER_INCH
+    x_values = datapoints['values']
+    x_max = max(x_values) + 1
+    y_max = max([max(values) for _, values, _ in series if values] + [0])
+    y_top = (y_max + y_max * 0.15) or 1
+    plot_width = width - MARGIN_LEFT - MARGIN_RIGHT
+    plot_height = height - MARGIN_TOP - MARGIN_BOTTOM
+
+    def x_pos(value):
+        return MARGIN_LEFT + value / x_max * plot_width
+
+    def y_pos(value):
+        return MARGIN_TOP + plot_height - value / y_top * plot_height
+
+    elements = []
+    step = _nice_step(y_top)
+    tick = 0
+    while tick <= y_top:
+        elements.append(f'<line x1="{MARGIN_LEFT}" y1="{y_pos(tick):.1f}" x2="{width - MARGIN_RIGHT:.1f}" '
+                        f'y2="{y_pos(tick):.1f}" stroke="{GRID}"/>')
+        elements.append(_text(MARGIN_LEFT - 6, y_pos(tick), f"{tick:g}", anchor="end", baseline="middle"))
+        tick = round(tick + step, 10)
+    labels = datapoints.get('labels', [str(value) for value in x_values])
+    for value, label in zip(x_values, labels):
+        elements.append(f'<line x1="{x_pos(value):.1f}" y1="{MARGIN_TOP}" x2="{x_pos(value):.1f}" '
+                        f'y2="{MARGIN_TOP + plot_height:.1f}" stroke="{GRID}"/>')
+        elements.append(_text(x_pos(value), MARGIN_TOP + plot_height + 16, label))
+    elements.append(_text(MARGIN_LEFT + plot_width / 2, height - 8, datapoints['x_axis']))
+    elements.append(_text(14, MARGIN_TOP + plot_height / 2, datapoints['y_axis'], rotate=-90))
+
+    for label, values, color in series:
+        if not values:
+            continue
+        points = " ".join(f"{x_pos(x):.1f},{y_pos(y):.1f}" for x, y in zip(x_values, values))
+        dash = ' stroke-dasharray="7,3"' if dashed else ""
+        elements.append(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2"{dash}/>')
+        for x, y in zip(x_values, values):
+            if dashed:
+                elements.append(f'<circle cx="{x_pos(x):.1f}" cy="{y_pos(y):.1f}" r="4" fill="{color}"/>')
+            elements.append(_text(x_pos(x), y_pos(y + y_max * 0.05), y, anchor="start"))
+
+    legend = [(label, color) for label, values, color in series if label and values]
+    for index, (label, color) in enumerate(legend):
+        y = MARGIN_TOP + 12 + index * 16
+        elements.append(f'<line x1="{MARGIN_LEFT + 8}" y1="{y}" x2="{MARGIN_LEFT + 28}" y2="{y}" '
+                        f'stroke="{color}" stroke-width="2"/>')
+        elements.append(_text(MARGIN_LEFT + 34, y, label, anchor="start", baseline="middle"))
+    return _svg(width, height, elements)
+
+
+def alerts_linechart(datapoints):
+    """SVG version of chart_generator.alerts_linechart."""
+    return _line_chart(datapoints, [(None, datapoints['keys'], YELLOW)], dashed=True)
+
+
+def _metrics_series(datapoints, metrics_config):
+    series = []
+    for (metric, label), color in zip(metrics_config, LINE_COLORS):
+        if datapoints.get(f'{metric}_has_data', True) and datapoints.get(metric):
+            series.append((label, datapoints[metric], color))
+    return series
+
+
+def ui_metrics_chart_pages(datapoints):
+    """SVG version of chart_generator.ui_metrics_chart_pages."""
+    return _line_chart(datapoints, _metrics_series(datapoints, [('ttfb', 'TTFB'), ('tbt', 'TBT'), ('lcp', 'LCP')]))
+
+
+def ui_metrics_chart_actions(datapoints):
+    """SVG version of chart_generator.ui_metrics_chart_actions."""
+    return _line_chart(datapoints, _metrics_series(datapoints, [('cls', 'CLS'), ('tbt', 'TBT'), ('inp', 'INP')]))
+
+
+def _symlog(value, linthresh=5.0):
+    """Symmetric log2 scale with a linear region around zero, as plt.yscale('symlog', base=2, linthresh=5)."""
+    if abs(value) <= linthresh:
+        return value / linthresh
+    return math.copysign(1 + math.log2(abs(value) / linthresh), value)
+
+
+def barchart(datapoints):
+    """SVG version of chart_generator.barchart: bars up for passed requests, down for degraded ones."""
+    width = datapoints['width'] * 2 * PX_PER_INCH
+    height = datapoints['height'] * 2 * PX_PER_INCH
+    groups = [(datapoints[f'{name}_keys'], datapoints[f'{name}_request'], color,
+               datapoints.get(f'{name}_request_name') if name != 'utility' else None)
+              for name, color in BAR_COLORS.items()]
+    keys = [key for group_keys, _, _, _ in groups for key in group_keys]
+    scaled = [abs(_symlog(value)) for _, values, _, _ in groups for value in values] or [1]
+    x_max = (max(keys) if keys else 0) + 1
+    y_extent = max(scaled) * 1.6 or 1
+    slot = width / x_max
+    zero = height / 2
+
+    def y_pos(value):
+        return zero - _symlog(value) / y_extent * (height / 2)
+
+    elements = [f'<line x1="0" y1="{zero:.1f}" x2="{width:.1f}" y2="{zero:.1f}" stroke="black"/>']
+    for group_keys, values, color, names in groups:
+        for index, (key, value) in enumerate(zip(group_keys, values)):
+            x = key * slot
+            top, bottom = sorted([y_pos(value), zero])
+            elements.append(f'<rect x="{x - slot * 0.4:.1f}" y="{top:.1f}" width="{slot * 0.8:.1f}" '
+                            f'height="{bottom - top:.1f}" fill="{color}"/>')
+            if not names:
+                continue
+            if value > 0:
+                elements.append(_text(x, top - 4, f" {value} s", anchor="start", rotate=-90))
+                elements.append(_text(x, zero + 4, f"{names[index]} ", anchor="end", rotate=-90))
+            else:
+                elements.append(_text(x, bottom + 4, f"{float(value) * -1} s ", anchor="end", rotate=-90))
+                elements.append(_text(x, zero - 4, f" {names[index]}", anchor="start", rotate=-90))
+    return _svg(width, height, elements)
@@ -0,0 +1,114 @@
+# Copyright 2019 getcarrier.io
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Source transformations applied to the email templates before Jinja compiles them.
+
+Only the static HTML skeleton is touched, Jinja tags are copied as is:
+ - single class rules of the <style> block (`.name { ... }`) are inlined into the style attribute
+   of the elements using the class, other rules (e.g. `*`) stay in a minified <style> block;
+ - HTML comments are dropped (conditional `<!--[if ...]>` comments are kept);
+ - whitespace next to block level tags is removed and other whitespace runs are collapsed,
+   which does not change how the HTML is rendered. <pre>, <textarea>, <script> and elements
+   styled with `white-space: pre*` are kept verbatim.
+"""
+
+import re
+
+BLOCK_TAGS = ("html|head|body|meta|link|title|style|table|thead|tbody|tfoot|tr|td|th|div|p|h[1-6]|"
+              "ul|ol|li|br|hr|center")
+
+_JINJA = r"\{\{.*?\}\}|\{%.*?%\}|\{#.*?#\}"
+_VERBATIM = (r"<(?P<raw>pre|textarea|script)\b.*?</(?P=raw)\s*>"
+             r"|<(?P<pre>\w+)\b[^<>]*white-space:\s*pre[^<>]*>.*?</(?P=pre)\s*>")
+_PROTECTED = re.compile(f"{_VERBATIM}|{_JINJA}", re.S | re.I)
+_STYLE_BLOCK = re.compile(r"(<style\b[^<>]*>)(.*?)(</style\s*>)", re.S | re.I)
+_CLASS_RULE = re.compile(r"^\.([\w-]+)$")
+_CLASS_ATTR = re.compile(r"""<(\w+)\b([^<>]*?)\sclass=(["'])(.*?)\3([^<>]*)>""", re.S)
+_STYLE_ATTR = re.compile(r"""\sstyle=(["'])(.*?)\1""", re.S)
+_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_AFTER_BLOCK = re.compile(rf"(</?(?:{BLOCK_TAGS})\b[^<>]*>)\s+", re.I)
+_BEFORE_BLOCK = re.compile(rf"\s+(?=</?(?:{BLOCK_TAGS})\b)", re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = _WHITESPACE.sub(" ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def _declarations(body):
+    return [declaration.strip() for declaration in body.split(";") if declaration.strip()]
+
+
+def inline_css(source):
+    """Move `.class` rules of <style> blocks into the style attributes of the elements using them."""
+    classes = {}
+
+    def split_rules(match):
+        kept = []
+        for selectors, body in re.findall(r"([^{}]+)\{([^{}]*)\}", re.sub(r"/\*.*?\*/", "", match.group(2), flags=re.S)):
+            selector = selectors.strip()
+            class_rule = _CLASS_RULE.match(selector)
+            if class_rule:
+                classes.setdefault(class_rule.group(1), []).extend(_declarations(body))
+            else:
+                kept.append(f"{selector}{{{';'.join(_declarations(body))}}}")
+        return f"{match.group(1)}{''.join(kept)}{match.group(3)}" if kept else ""
+
+    source = _STYLE_BLOCK.sub(split_rules, source)
+    if not classes:
+        return source
+
+    def inline(match):
+        tag, before, _, names, after = match.groups()
+        declarations = [declaration for name in names.split() for declaration in classes.get(name, [])]
+        if not declarations:
+            return match.group(0)
+        attributes = f"{before}{after}"
+        style = _STYLE_ATTR.search(attributes)
+        if style:
+            # declarations already inline win over the class ones, as they would in the browser
+            declarations += _declarations(style.group(2))
+            attributes = attributes[:style.start()] + attributes[style.end():]
+        return f'<{tag}{attributes} style="{"; ".join(declarations)};">'
+
+    return _CLASS_ATTR.sub(inline, source)
+
+
+def _minify_text(text):
+    text = _COMMENT.sub("", text)
+    text = _AFTER_BLOCK.sub(r"\1", text)
+    text = _BEFORE_BLOCK.sub("", text)
+    return _WHITESPACE.sub(lambda match: "\n" if "\n" in match.group(0) else " ", text)
+
+
+def minify_html(source):
+    """Minify the HTML around Jinja tags and verbatim elements, keeping them unchanged."""
+    source = _STYLE_BLOCK.sub(lambda match: f"{match.group(1)}{minify_css(match.group(2))}{match.group(3)}",
+                              source)
+    parts = []
+    position = 0
+    for match in _PROTECTED.finditer(source):
+        parts.append(_minify_text(source[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_minify_text(source[position:]))
+    return "".join(parts)
+
+
+def optimize_template(source):
+    return minify_html(inline_css(source))
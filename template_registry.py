@@ -0,0 +1,121 @@
+# Copyright 2019 getcarrier.io
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Process-wide Jinja2 environment for the email templates.
+
+Templates are compiled once per process and kept by the environment. Compiled bytecode is also
+stored in JINJA_BYTECODE_CACHE_DIR (/tmp survives Lambda warm starts). When the deployment zip ships
+precompiled template modules in JINJA_PRECOMPILED_DIR they are loaded instead of parsing the sources.
+Precompiled modules are built from optimized sources and are only used while TEMPLATE_OPTIMIZE is on.
+With TEMPLATE_OPTIMIZE the sources are passed through template_optimizer (CSS inlining and HTML
+minification) before compiling, so only the dynamic parts are left to do at render time.
+
+Precompile (done by the zip builder):
+    python template_registry.py compile [target_dir]
+"""
+
+import os
+import sys
+import threading
+from os import environ
+
+from jinja2 import ChoiceLoader, Environment, FileSystemBytecodeCache, FileSystemLoader, ModuleLoader
+
+from template_optimizer import optimize_template
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+# bytecode cache directory, empty - disabled
+JINJA_BYTECODE_CACHE_DIR = environ.get("JINJA_BYTECODE_CACHE_DIR", "/tmp/jinja_bytecode_cache")
+JINJA_PRECOMPILED_DIR = environ.get("JINJA_PRECOMPILED_DIR", os.path.join(BASE_DIR, "templates_compiled"))
+# inline CSS and minify the template sources before compiling them
+TEMPLATE_OPTIMIZE = environ.get("TEMPLATE_OPTIMIZE", "true")
+
+_filters = {}
+_environment = None
+_lock = threading.Lock()
+
+
+def template_filter(func):
+    """Register a function as a Jinja filter of the shared environment under its own name."""
+    _filters[func.__name__] = func
+    if _environment is not None:
+        _environment.filters[func.__name__] = func
+    return func
+
+
+class OptimizingLoader(FileSystemLoader):
+    """FileSystemLoader returning the sources passed through template_optimizer."""
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super(OptimizingLoader, self).get_source(environment, template)
+        return optimize_template(source), filename, uptodate
+
+
+def _bytecode_cache():
+    if not JINJA_BYTECODE_CACHE_DIR:
+        return None
+    try:
+        os.makedirs(JINJA_BYTECODE_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(JINJA_BYTECODE_CACHE_DIR)
+    except OSError as e:
+        print(f"[TEMPLATES] Bytecode cache disabled: {e}")
+        return None
+
+
+def create_environment(precompiled_dir=None, optimize=None):
+    optimize = str(TEMPLATE_OPTIMIZE if optimize is None else optimize).lower() in ["true", "1"]
+    if optimize:
+        loader = OptimizingLoader(TEMPLATES_DIR)
+    else:
+        loader = FileSystemLoader(TEMPLATES_DIR)
+    precompiled_dir = JINJA_PRECOMPILED_DIR if precompiled_dir is None else precompiled_dir
+    # precompiled modules are optimized, with optimization off the templates are compiled from the sources
+    if optimize and precompiled_dir and os.path.isdir(precompiled_dir):
+        loader = ChoiceLoader([ModuleLoader(precompiled_dir), loader])
+    env = Environment(loader=loader, bytecode_cache=_bytecode_cache())
+    env.filters.update(_filters)
+    return env
+
+
+def get_environment():
+    global _environment
+    if _environment is None:
+        with _lock:
+            if _environment is None:
+                _environment = create_environment()
+    return _environment
+
+
+def get_template(name):
+    """Compiled template by name, parsed and compiled at most once per process."""
+    return get_environment().get_template(name)
+
+
+def compile_templates(target_dir):
+    """Precompile all templates into python modules for ModuleLoader."""
+    # filters have to be registered before compiling templates that use them
+    import report_builder  # noqa: F401
+    env = create_environment(precompiled_dir="", optimize=True)
+    env.compile_templates(target_dir, zip=None, ignore_errors=False,
+                          filter_func=lambda name: name.endswith(".html"))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["compile"]:
+        sys.exit(f"Usage: python {sys.argv[0]} compile [target_dir]")
+    # run through the importable module, report_builder registers its filters there
+    import template_registry
+    template_registry.compile_templates(sys.argv[2] if len(sys.argv) > 2 else JINJA_PRECOMPILED_DIR)
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from api_email_notification import ApiEmailNotification
+
+
+ARGS = {
+    "influx_host": "localhost", "influx_port": 8086, "influx_user": "", "influx_password": "",
+    "influx_db": "jmeter", "comparison_db": "comparison", "simulation": "test", "test": "test", "env": "stage",
+    "galloper_url": "http://galloper", "token": "token", "project_id": 1, "comparison_metric": "pct95"
+}
+
+
+def _notification(monkeypatch, delay=0.2):
+    notification = ApiEmailNotification(dict(ARGS))
+    manager, builder = notification.data_manager, notification.report_builder
+    started = []
+
+    def slow(name, value):
+        def call(*args, **kwargs):
+            started.append((name, time.perf_counter(), threading.get_ident()))
+            time.sleep(delay)
+            return value
+        return call
+
+    monkeypatch.setattr(manager, "get_last_builds", slow("builds", [[{"build_id": "build_2"}], [{"build_id": "build_1"}]]))
+    monkeypatch.setattr(manager, "get_baseline", slow("baseline", [{"build_id": "build_1"}]))
+    monkeypatch.setattr(manager, "fetch_thresholds", slow("thresholds", []))
+    monkeypatch.setattr(notification, "_get_report_data", slow("report", {"id": 2}))
+    monkeypatch.setattr(builder, "fetch_api_reports_for_comparison", slow("reports", {"build_2": {"report_id": 2}}))
+    monkeypatch.setattr(builder, "_get_baseline_api_report_id", slow("baseline_report", 1))
+    monkeypatch.setattr(manager, "evaluate_api_test", lambda tests_data, baseline: (
+        tests_data, tests_data[0], baseline, 10, [{"target": "response_time"}]))
+    return notification, started
+
+
+def test_prefetch_populates_context_concurrently(monkeypatch):
+    notification, started = _notification(monkeypatch)
+
+    start = time.perf_counter()
+    context = notification.prefetch()
+    elapsed = time.perf_counter() - start
+
+    assert context.tests_data[0] == [{"build_id": "build_2"}] and context.last_test_data == [{"build_id": "build_2"}]
+    assert (context.baseline, context.violation, context.thresholds) == ([{"build_id": "build_1"}], 10,
+                                                                         [{"target": "response_time"}])
+    assert context.report_data == {"id": 2} and context.api_reports == {"build_2": {"report_id": 2}}
+    assert context.baseline_report_fetched and context.baseline_report_id == 1
+    assert notification.args["build_id"] == "build_2"
+    # two dependent stages instead of six sequential calls
+    assert elapsed < 0.2 * 4
+    assert len({thread for _, _, thread in started}) > 1
+
+
+def test_prefetch_serial_with_single_worker(monkeypatch):
+    monkeypatch.setattr("api_email_notification.PREFETCH_WORKERS", 1)
+    notification, started = _notification(monkeypatch, delay=0)
+
+    context = notification.prefetch()
+
+    assert [name for name, _, _ in started] == ["builds", "baseline", "thresholds", "report", "reports",
+                                                "baseline_report"]
+    assert context.baseline_report_id == 1
@@ -0,0 +1,56 @@
+import os
+
+import chart_generator
+import chart_renderer
+from chart_cache import ChartCache, chart_key
+
+
+DATAPOINTS = {"title": "Throughput", "label": "Throughput, req/s", "x_axis": "Test Runs", "y_axis": "Throughput",
+              "width": 10, "height": 2, "keys": [10.5, 11.0], "values": [1, 2], "labels": ["01-Jan", "02-Jan"]}
+
+
+def test_key_depends_on_content_only():
+    reordered = dict(reversed(list(DATAPOINTS.items())))
+
+    assert chart_key("alerts_linechart", DATAPOINTS, "matplotlib") == \
+        chart_key("alerts_linechart", reordered, "matplotlib")
+    assert chart_key("alerts_linechart", DATAPOINTS, "matplotlib") != \
+        chart_key("alerts_linechart", dict(DATAPOINTS, keys=[10.5, 12.0]), "matplotlib")
+    assert chart_key("alerts_linechart", DATAPOINTS, "matplotlib") != chart_key("alerts_linechart", DATAPOINTS, "svg")
+
+
+def test_memory_tier_is_lru():
+    cache = ChartCache(size=2, directory="")
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (b"1", b"3")
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_disk_tier_survives_process_and_evicts_by_size(tmp_path):
+    cache = ChartCache(size=0, directory=str(tmp_path), max_bytes=10)
+    cache.put("old", b"12345")
+    os.utime(tmp_path / "old.chart", (1, 1))
+    cache.put("new", b"67890")
+    assert ChartCache(size=1, directory=str(tmp_path)).get("old") == b"12345"
+
+    cache.put("newest", b"abc")
+
+    # reading "old" made it recently used, so "new" is evicted
+    assert sorted(os.listdir(tmp_path)) == ["newest.chart", "old.chart"]
+
+
+def test_identical_chart_is_not_rendered_again(monkeypatch):
+    monkeypatch.setattr(chart_renderer, "chart_cache", ChartCache(size=8, directory=""))
+    spec = ("alerts_linechart", DATAPOINTS)
+    first = chart_renderer.render_charts([spec], mode="serial")
+
+    def no_rendering(datapoints):
+        raise AssertionError("chart rendered twice")
+    monkeypatch.setattr(chart_generator, "alerts_linechart", no_rendering)
+
+    assert chart_renderer.render_charts([spec, spec], mode="serial") == first * 2
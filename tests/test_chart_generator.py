@@ -0,0 +1,78 @@
+import sys
+
+import pytest
+
+import chart_generator
+from report_builder import ReportBuilder
+from ui_email_notification import UIEmailNotification
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+BUILDS = [{"date": f"0{index}-Jan", "error_rate": index, "throughput": 10.5 + index, "response_time": 0.5 * index}
+          for index in range(1, 4)]
+
+
+def test_charts_render_into_memory(monkeypatch):
+    # matplotlib itself reads its config and font cache on (lazy) import
+    chart_generator._load_pyplot()
+
+    def no_files(*args, **kwargs):
+        raise AssertionError("charts must not touch the filesystem")
+    monkeypatch.setattr("builtins.open", no_files)
+
+    images = [ReportBuilder.create_success_rate_chart(BUILDS), ReportBuilder.create_throughput_chart(BUILDS),
+              ReportBuilder.create_response_time_chart(BUILDS)]
+
+    for image, content_id in zip(images, ["<success_rate>", "<throughput>", "<response_time>"]):
+        assert image["Content-ID"] == content_id
+        assert image.get_content_type() == "image/png"
+        assert image.get_payload(decode=True).startswith(PNG_SIGNATURE)
+
+
+def test_barchart_and_ui_charts_return_png_bytes():
+    last_test_data = [{"request_name": "home", "pct95": 1200, "pct95_threshold": "green"},
+                      {"request_name": "login", "pct95": 2500, "pct95_threshold": "red"}]
+    baseline = [{"request_name": "home", "pct95": 1000}, {"request_name": "login", "pct95": 3000}]
+    ui_builds = [{"date": "01-Jan", "ttfb": 0.2, "tbt": 0.1, "lcp": 1.5, "cls": 0.01, "inp": 0.2},
+                 {"date": "02-Jan", "ttfb": "No data", "tbt": 0.2, "lcp": 1.7, "cls": 0.02, "inp": "No data"}]
+
+    images = [ReportBuilder.create_comparison_vs_baseline_barchart(last_test_data, baseline, "pct95"),
+              ReportBuilder.create_thresholds_chart(last_test_data, "pct95"),
+              UIEmailNotification.create_ui_metrics_chart_pages(ui_builds),
+              UIEmailNotification.create_ui_metrics_chart_actions(ui_builds)]
+
+    assert all(image.get_payload(decode=True).startswith(PNG_SIGNATURE) for image in images)
+    assert not chart_generator.plt.get_fignums()
+
+
+BARS = {"green_keys": [1, 2], "green_request": [0.5, 1.2], "green_request_name": ["home", "search"],
+        "red_keys": [3], "red_request": [-4.5], "red_request_name": ["login"],
+        "yellow_keys": [], "yellow_request": [], "yellow_request_name": [],
+        "utility_keys": [], "utility_request": [], "utility_request_name": [], "width": 8, "height": 4.5}
+
+
+def _png_width(data):
+    return int.from_bytes(data[16:20], "big")
+
+
+def test_email_profile_shrinks_barchart():
+    classic = chart_generator.barchart(dict(BARS, profile="classic"))
+    email = chart_generator.barchart(dict(BARS, profile="email"))
+
+    assert email.startswith(PNG_SIGNATURE)
+    assert _png_width(email) <= chart_generator.RENDER_PROFILES["email"]["max_width_px"] < _png_width(classic)
+    assert len(email) < len(classic) / 5
+
+
+def test_reencoding_is_skipped_with_a_warning_without_pillow(monkeypatch, capsys):
+    png = chart_generator.barchart(dict(BARS, profile="classic"))
+    monkeypatch.setitem(sys.modules, "PIL", None)
+
+    assert chart_generator._reencode_png(png, compress_level=9, colors=64) == png
+    assert "Pillow is not installed" in capsys.readouterr().out
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        chart_generator.barchart(dict(BARS, profile="huge"))
@@ -0,0 +1,50 @@
+import pytest
+
+import chart_renderer
+from chart_cache import ChartCache
+from report_builder import ReportBuilder
+
+
+BUILDS = [{"date": f"0{index}-Jan", "error_rate": index, "throughput": 10.5 + index, "response_time": 0.5 * index}
+          for index in range(1, 4)]
+
+
+def _specs():
+    return [ReportBuilder.success_rate_chart_spec(BUILDS)[:2], ReportBuilder.throughput_chart_spec(BUILDS)[:2],
+            ReportBuilder.response_time_chart_spec(BUILDS)[:2]]
+
+
+def test_process_pool_matches_serial_rendering(monkeypatch):
+    monkeypatch.setattr(chart_renderer, "chart_cache", ChartCache(size=0, directory=""))
+    serial = chart_renderer.render_charts(_specs(), mode="serial")
+    parallel = chart_renderer.render_charts(_specs(), mode="process", workers=3)
+
+    assert len(parallel) == 3
+    assert parallel == serial
+
+
+def test_process_pool_ignores_lock_held_by_serial_render(monkeypatch):
+    monkeypatch.setattr(chart_renderer, "chart_cache", ChartCache(size=0, directory=""))
+    serial = chart_renderer.render_charts(_specs(), mode="serial")
+
+    # a concurrent event of the batch is rendering serially while the pool starts
+    with chart_renderer._pyplot_lock:
+        parallel = chart_renderer.render_charts(_specs(), mode="process", workers=2)
+
+    assert parallel == serial
+
+
+def test_falls_back_to_serial_without_worker_processes(monkeypatch):
+    def no_processes(*args, **kwargs):
+        raise OSError("[Errno 38] Function not implemented")
+    monkeypatch.setattr(chart_renderer, "ProcessPoolExecutor", no_processes)
+
+    images = chart_renderer.chart_images([ReportBuilder.success_rate_chart_spec(BUILDS),
+                                          ReportBuilder.throughput_chart_spec(BUILDS)], mode="process", workers=2)
+
+    assert [image["Content-ID"] for image in images] == ["<success_rate>", "<throughput>"]
+
+
+def test_unknown_chart_is_rejected():
+    with pytest.raises(ValueError):
+        chart_renderer.render_chart("savefig", {})
@@ -0,0 +1,319 @@
+import re
+
+import numpy as np
+import pytest
+from influxdb.resultset import ResultSet
+
+import data_manager
+from data_manager import DataManager
+from resource_registry import ResourceRegistry
+
+
+ARGS = {
+    "influx_host": "localhost", "influx_port": 8086, "influx_user": "", "influx_password": "",
+    "influx_db": "jmeter", "comparison_db": "comparison", "simulation": "test", "build_id": "build_1",
+    "type": "load", "env": "stage"
+}
+
+
+def _series(tags, count):
+    return {"name": "test", "tags": tags, "columns": ["time", "count"], "values": [["1970-01-01T00:00:00Z", count]]}
+
+
+class FakeInfluxClient:
+    def __init__(self, series=None, samples=None):
+        self.series = series or []
+        self.samples = samples or {}
+        self.queries = []
+        self.written = []
+        self.pushdown_skew = 0
+
+    def switch_database(self, database):
+        pass
+
+    def write_points(self, points):
+        self.written.extend(points)
+
+    def query(self, query):
+        self.queries.append(query)
+        if "sum(\"max\")" in query:
+            return self._points(["sum"], [[10]])
+        if query.startswith("select first"):
+            return self._points(["time", "first"], [["2024-01-01T10:00:00.000Z", 100]])
+        if query.startswith("select last"):
+            return self._points(["time", "last"], [["2024-01-01T10:10:00.000Z", 100]])
+        if query.startswith("select response_time"):
+            name, method = re.search(r"request_name='(.*?)' and method='(.*?)'", query).groups()
+            times = self.samples[(name, method)]
+            if " limit " in query:
+                last_read = re.search(r"time>'(.*?)'", query).group(1)
+                offset = int(last_read) if last_read.isdigit() else 0
+                limit = int(query.rsplit(" ", 1)[1])
+                times = times[offset:offset + limit]
+                return self._points(["time", "response_time"],
+                                    [[str(offset + index + 1), value] for index, value in enumerate(times)])
+            return self._points(["time", "response_time"], [[str(index), value] for index, value in enumerate(times)])
+        if query.startswith("show tag values"):
+            if "key=\"request_name\"" in query:
+                names = sorted({name for name, _ in self.samples})
+            else:
+                request_name = re.search(r"request_name='(.*?)'", query).group(1)
+                names = sorted({method for name, method in self.samples if name == request_name})
+            return self._points(["key", "value"], [["key", name] for name in names])
+        if query.startswith("select count") and "request_name=" in query:
+            count = 0
+            for series in self.series:
+                tags = series["tags"]
+                if f"request_name='{tags['request_name']}' and method='{tags['method']}'" not in query:
+                    continue
+                status = re.search(r"status='(.*?)'", query)
+                code = re.search(r"status_code=~/\^(\d)/", query)
+                if status and status.group(1) != tags["status"] or code and not tags["status_code"].startswith(
+                        code.group(1)):
+                    continue
+                if "status_code!~" in query and any(digit in tags["status_code"] for digit in "12345"):
+                    continue
+                count += series["values"][0][1]
+            return self._points(["time", "count"], [["1970-01-01T00:00:00Z", count]])
+        if query.startswith("select min("):
+            columns = ["time", "min", "max", "mean", "pct50", "pct75", "pct90", "pct95", "pct99"]
+            groups = self.samples.items() if "group by" in query else [(None, sum(self.samples.values(), []))]
+            series = []
+            for key, times in groups:
+                row = ["1970-01-01T00:00:00Z", min(times), max(times), float(np.mean(times))]
+                row += [int(value) + self.pushdown_skew for value in np.percentile(times, [50, 75, 90, 95, 99])]
+                entry = {"name": "test", "columns": columns, "values": [row]}
+                if key:
+                    entry["tags"] = {"request_name": key[0], "method": key[1]}
+                series.append(entry)
+            return ResultSet({"series": series})
+        if "group by" in query:
+            return ResultSet({"series": self.series})
+        if query.startswith("select count"):
+            return self._points(["time", "count"], [["1970-01-01T00:00:00Z", sum(s["values"][0][1] for s in self.series)]])
+        raise AssertionError(f"unexpected query {query}")
+
+    @staticmethod
+    def _points(columns, values):
+        return ResultSet({"series": [{"name": "test", "columns": columns, "values": values}]})
+
+
+def _build_client():
+    random = np.random.RandomState(1)
+    samples = {("home", "GET"): list(random.randint(50, 900, size=5000)),
+               ("login", "POST"): list(random.randint(100, 3000, size=3000))}
+    series = [
+        _series({"request_name": "home", "method": "GET", "status": "OK", "status_code": "200"}, 5000),
+        _series({"request_name": "login", "method": "POST", "status": "OK", "status_code": "200"}, 2990),
+        _series({"request_name": "login", "method": "POST", "status": "KO", "status_code": "500"}, 10),
+    ]
+    return FakeInfluxClient(series, samples)
+
+
+def _write(client, **args):
+    manager = DataManager(dict(ARGS, **args), None, None, None)
+    manager.client = client
+    user_count, duration, response_times = manager.write_comparison_data_to_influx()
+    return {point["tags"]["request_name"]: point["fields"] for point in client.written}, response_times
+
+
+def test_grouped_request_counters_pivot():
+    manager = DataManager(dict(ARGS), None, None, None)
+    manager.client = FakeInfluxClient([
+        _series({"request_name": "login", "method": "POST", "status": "OK", "status_code": "200"}, 90),
+        _series({"request_name": "login", "method": "POST", "status": "KO", "status_code": "500"}, 7),
+        _series({"request_name": "login", "method": "POST", "status": "KO", "status_code": "NaN"}, 3),
+        _series({"request_name": "home", "method": "GET", "status": "OK", "status_code": "302"}, 50),
+    ])
+    reqs = manager.get_grouped_request_counters(150)
+
+    assert len(manager.client.queries) == 1
+    assert [(req["request_name"], req["method"]) for req in reqs] == [("home", "GET"), ("login", "POST")]
+    login = reqs[1]
+    assert (login["total"], login["OK"], login["KO"]) == (100, 90, 10)
+    assert (login["2xx"], login["5xx"], login["NaN"], login["4xx"]) == (90, 7, 3, 0)
+    assert reqs[0]["3xx"] == 50
+
+
+def test_grouped_request_counters_mismatch_raises():
+    manager = DataManager(dict(ARGS), None, None, None)
+    manager.client = FakeInfluxClient([
+        _series({"request_name": "home", "method": "GET", "status": "OK", "status_code": "200"}, 50),
+    ])
+    try:
+        manager.get_grouped_request_counters(60)
+    except Exception as e:
+        assert "60" in str(e)
+    else:
+        raise AssertionError("mismatched totals should fall back to per request queries")
+
+
+def test_grouped_request_counters_without_status_code_tag_raises():
+    manager = DataManager(dict(ARGS), None, None, None)
+    # status_code is a field, the result is only grouped by request_name, method and status
+    manager.client = FakeInfluxClient([
+        _series({"request_name": "home", "method": "GET", "status": "OK"}, 50),
+        _series({"request_name": "home", "method": "GET", "status": "KO", "status_code": ""}, 10),
+    ])
+
+    with pytest.raises(Exception, match="status_code"):
+        manager.get_grouped_request_counters(60)
+
+
+def test_write_comparison_data_exact():
+    client = _build_client()
+    fields, response_times = _write(client)
+
+    everything = client.samples[("home", "GET")] + client.samples[("login", "POST")]
+    assert fields["login"]["pct95"] == int(np.percentile(client.samples[("login", "POST")], 95))
+    assert fields["login"]["ko"] == 10 and fields["login"]["5xx"] == 10
+    assert fields["All"]["total"] == 8000 and fields["All"]["ok"] == 7990
+    assert response_times["pct90"] == int(np.percentile(everything, 90))
+    assert response_times["max"] == max(everything)
+
+
+def test_write_comparison_data_sharded_sketch():
+    exact_fields, exact_times = _write(_build_client())
+    fields, response_times = _write(_build_client(), percentile_mode="sketch", sketch_relative_accuracy=0.01,
+                                    sketch_batch_size=1024)
+
+    for name in ["home", "login", "All"]:
+        assert fields[name]["min"] == exact_fields[name]["min"]
+        assert fields[name]["max"] == exact_fields[name]["max"]
+        for pct in ["pct50", "pct95", "pct99"]:
+            assert abs(fields[name][pct] - exact_fields[name][pct]) <= 0.01 * exact_fields[name][pct] + 1
+    assert response_times["mean"] == exact_times["mean"]
+
+
+def test_sketch_mode_pages_every_request():
+    client = _build_client()
+    _write(client, percentile_mode="sketch", sketch_batch_size=1000)
+
+    pages = [query for query in client.queries if query.startswith("select response_time")]
+    # 5000 home and 3000 login samples, each request is below BATCH_SIZE and still paged
+    assert len(pages) == 8
+    assert all(query.endswith(" limit 1000") for query in pages)
+
+
+def test_write_comparison_data_pushdown():
+    exact_fields, exact_times = _write(_build_client())
+    client = _build_client()
+    fields, response_times = _write(client, percentile_mode="pushdown")
+
+    assert not any(query.startswith("select response_time") for query in client.queries)
+    assert fields == exact_fields
+    assert response_times == exact_times
+
+
+def test_verify_pushdown_reports_mismatches():
+    client = _build_client()
+    client.pushdown_skew = 100
+    manager = DataManager(dict(ARGS, percentile_mode="pushdown", verify_pushdown=True, pushdown_tolerance=0.05),
+                          None, None, None)
+    manager.client = client
+    manager.write_comparison_data_to_influx()
+
+    assert manager.pushdown_mismatches
+    assert {mismatch["metric"] for mismatch in manager.pushdown_mismatches} <= {"pct50", "pct75", "pct90",
+                                                                                  "pct95", "pct99"}
+
+
+def test_parallel_ingestion_matches_serial(monkeypatch):
+    monkeypatch.setattr(data_manager, "BATCH_SIZE", 1024)
+    monkeypatch.setattr(data_manager, "registry", ResourceRegistry())
+    client = _build_client()
+    monkeypatch.setattr(DataManager, "new_influx_client", lambda self: client)
+    for mode in ["exact", "sketch"]:
+        serial_fields, serial_times = _write(_build_client(), aggregation_mode="per_request", percentile_mode=mode,
+                                             sketch_relative_accuracy=0.01, sketch_batch_size=1024)
+        client.written = []
+        fields, response_times = _write(client, aggregation_mode="per_request", ingest_workers=4,
+                                        percentile_mode=mode, sketch_relative_accuracy=0.01, sketch_batch_size=1024)
+
+        assert client.written
+        if mode == "exact":
+            assert fields == serial_fields
+            assert response_times == serial_times
+        else:
+            # merged worker sketches stay within the sketch's relative error of the serial sketch
+            for name in ["home", "login", "All"]:
+                assert (fields[name]["min"], fields[name]["max"]) == (serial_fields[name]["min"],
+                                                                      serial_fields[name]["max"])
+                for pct in ["pct50", "pct95", "pct99"]:
+                    assert abs(fields[name][pct] - serial_fields[name][pct]) <= 0.02 * serial_fields[name][pct] + 1
+            assert response_times["mean"] == serial_times["mean"]
+
+
+def test_ingest_workers_reuse_registry_clients(monkeypatch):
+    monkeypatch.setattr(data_manager, "registry", ResourceRegistry())
+    created = []
+
+    def new_client(self):
+        created.append(FakeInfluxClient())
+        return created[-1]
+    monkeypatch.setattr(DataManager, "new_influx_client", new_client)
+    manager = DataManager(dict(ARGS, ingest_workers=2), None, None, None)
+
+    for _ in range(3):
+        assert manager.map_requests(lambda item: item * 2, range(4)) == [0, 2, 4, 6]
+
+    # the main client and one client per worker, shared by all pools
+    assert len(created) == 3
+    assert {id(client) for client in data_manager.registry.resources("influx")} == {id(c) for c in created}
+
+
+class FakeComparisonClient(FakeInfluxClient):
+    def __init__(self, rows, build_ids=("build_3", "build_2", "build_3", "build_1")):
+        super().__init__()
+        self.rows = rows
+        self.build_ids = build_ids
+
+    def query(self, query):
+        self.queries.append(query)
+        if query.startswith("select distinct(id)"):
+            return self._points(["time", "distinct"], [["1970-01-01T00:00:00Z", _id] for _id in self.build_ids])
+        if "build_id='" in query:
+            build_id = re.search(r"build_id='(.*)'$", query).group(1)
+            return self._points(["time", "build_id", "request_name"], [row for row in self.rows if row[1] == build_id])
+        pattern = re.search(r"build_id=~/(.*)/$", query).group(1).replace("\\/", "/")
+        rows = [row for row in self.rows if re.match(pattern, row[1])]
+        return self._points(["time", "build_id", "request_name"], rows)
+
+
+def test_get_last_builds_single_query():
+    rows = [["1970-01-01T00:00:0%sZ" % index, build_id, name] for index, (build_id, name) in enumerate([
+        ("build_1", "home"), ("build_2", "home"), ("build_3", "home"), ("build_1", "login"), ("build_3", "login"),
+        ("build_10", "home")])]
+    manager = DataManager(dict(ARGS, test="test", test_type="load", users=10, test_limit=5), None, None, None)
+    manager.client = FakeComparisonClient(rows)
+
+    tests_data = manager.get_last_builds()
+
+    assert len(manager.client.queries) == 2
+    assert [[(point["build_id"], point["request_name"]) for point in test] for test in tests_data] == [
+        [("build_3", "home"), ("build_3", "login")],
+        [("build_2", "home")],
+        [("build_1", "home"), ("build_1", "login")],
+    ]
+
+
+def test_build_ids_regex_escapes_metacharacters():
+    pattern = data_manager.build_ids_regex(["build.1", "a/b"])
+    assert pattern == "build\\.1|a\\/b"
+    assert re.fullmatch(pattern.replace("\\/", "/"), "a/b") and not re.fullmatch(pattern, "buildX1")
+
+
+def test_get_last_builds_matches_query_per_build():
+    build_ids = ["build.1", "run+2", "a/b", "v1|v2", "(x)", "build_10"]
+    rows = [["1970-01-01T00:00:%02dZ" % index, build_id, name] for index, (build_id, name) in enumerate(
+        (build_id, name) for name in ["home", "login"] for build_id in build_ids + ["buildX1", "v1", "x"])]
+    args = dict(ARGS, test="test", test_type="load", users=10, test_limit=5)
+    manager = DataManager(args, None, None, None)
+    manager.client = FakeComparisonClient(rows, build_ids)
+
+    # the path before batching: one exact match query per build
+    per_build = [list(manager.client.query(data_manager.SELECT_LAST_BUILD_DATA.format(_id)).get_points())
+                 for _id in build_ids]
+
+    assert manager.get_last_builds() == per_build
+    assert all(len(points) == 2 for points in per_build)
@@ -0,0 +1,212 @@
+import email as email_parser
+import smtplib
+import socketserver
+import threading
+import time
+from email.mime.image import MIMEImage
+
+import pytest
+
+import email_client
+from email_client import EmailClient
+from email_notifications import Email
+from resource_registry import ResourceRegistry
+
+
+class FakeSMTP(object):
+    sent = []
+
+    def __init__(self, host, port, timeout=None):
+        self.host, self.port = host, port
+
+    def ehlo(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, sender, recipients, message):
+        self.sent.append((sender, recipients, message))
+        return {}
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    FakeSMTP.sent = []
+    monkeypatch.setattr(email_client.smtplib, "SMTP_SSL", FakeSMTP)
+    monkeypatch.setattr(email_client, "registry", ResourceRegistry())
+    return FakeSMTP.sent
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Local SMTP stand-in: accepts any login, refuses refused@ recipients, drops sessions on demand."""
+    messages = []
+    connections = 0
+    max_connections = 0
+    opened = 0
+    drop_after = None
+    refused_prefix = "refused@"
+    lock = threading.Lock()
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        cls = type(self)
+        with cls.lock:
+            cls.connections += 1
+            cls.opened += 1
+            cls.max_connections = max(cls.max_connections, cls.connections)
+        delivered = 0
+        try:
+            self.reply("220 localhost ESMTP")
+            recipients = []
+            for line in self.rfile:
+                command = line.decode().strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    self.reply("250-localhost")
+                    self.reply("250 AUTH PLAIN LOGIN")
+                elif verb == "AUTH":
+                    self.reply("235 Authentication successful")
+                elif verb == "MAIL":
+                    if cls.drop_after is not None and delivered >= cls.drop_after:
+                        return
+                    recipients = []
+                    self.reply("250 OK")
+                elif verb == "RCPT":
+                    recipient = command.split(":", 1)[1].strip("<> ")
+                    if cls.refused_prefix and recipient.startswith(cls.refused_prefix):
+                        self.reply("550 No such user")
+                    else:
+                        recipients.append(recipient)
+                        self.reply("250 OK")
+                elif verb == "DATA":
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = b"".join(iter(self.rfile.readline, b".\r\n"))
+                    time.sleep(0.02)
+                    with cls.lock:
+                        cls.messages.append((recipients, data.decode()))
+                    delivered += 1
+                    self.reply("250 OK")
+                elif verb == "QUIT":
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("250 OK")
+        finally:
+            with cls.lock:
+                cls.connections -= 1
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+    server.daemon_threads = True
+    _SMTPHandler.messages, _SMTPHandler.max_connections, _SMTPHandler.drop_after = [], 0, None
+    _SMTPHandler.refused_prefix, _SMTPHandler.opened = "refused@", 0
+    registry = ResourceRegistry()
+    monkeypatch.setattr(email_client, "registry", registry)
+    # the stand-in speaks plain SMTP
+    monkeypatch.setattr(smtplib.SMTP, "starttls", lambda self: (220, b"Ready"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    registry.clear()
+    server.shutdown()
+    server.server_close()
+
+
+def _client(mode, port=465, pool_size=None):
+    return EmailClient({"smtp_host": "127.0.0.1", "smtp_port": port, "smtp_user": "carrier@example.com",
+                        "smtp_password": "secret", "smtp_sender": None, "email_send_mode": mode,
+                        "smtp_pool_size": pool_size})
+
+
+def _email(users_to=("a@example.com", "<mailto:b@example.com|b@example.com>")):
+    chart = MIMEImage(b"\x89PNG\r\n\x1a\n" + b"\0" * 1024, _subtype="png")
+    chart.add_header("Content-ID", "<chart>")
+    return Email("test", "Report", list(users_to), "<p>body</p>", [chart], "2026-01-05")
+
+
+def test_individual_mode_serializes_message_once(smtp, monkeypatch):
+    client = _client("individual", pool_size=1)
+    builds = []
+    build_message = client.build_message
+    monkeypatch.setattr(client, "build_message", lambda email: builds.append(email) or build_message(email))
+
+    client.send_email(_email())
+
+    assert len(builds) == 1
+    assert [recipients for _, recipients, _ in smtp] == ["a@example.com", "b@example.com"]
+    messages = [email_parser.message_from_string(message) for _, _, message in smtp]
+    assert [message["To"] for message in messages] == ["a@example.com", "b@example.com"]
+    assert smtp[0][2].split("\n", 1)[1] == smtp[1][2].split("\n", 1)[1]
+    assert [part.get("Content-ID") for part in messages[0].walk()][-1] == "<chart>"
+
+
+def test_bcc_mode_sends_one_message(smtp):
+    _client("bcc").send_email(_email())
+
+    assert len(smtp) == 1
+    sender, recipients, message = smtp[0]
+    assert sender == "carrier@example.com"
+    assert recipients == ["a@example.com", "b@example.com"]
+    assert "b@example.com" not in message
+    assert email_parser.message_from_string(message)["To"] == email_client.UNDISCLOSED_RECIPIENTS
+
+
+def test_unknown_send_mode():
+    with pytest.raises(Exception, match="email_send_mode"):
+        _client("broadcast")
+
+
+def test_recipients_are_delivered_over_parallel_connections(smtp_server):
+    users = [f"user{index}@example.com" for index in range(12)]
+
+    report = _client("individual", port=smtp_server, pool_size=3).send_email(_email(users))
+
+    assert report == {user: email_client.SENT for user in users}
+    assert sorted(recipients[0] for recipients, _ in _SMTPHandler.messages) == sorted(users)
+    assert 1 < _SMTPHandler.max_connections <= 3
+
+
+def test_dropped_sessions_are_reconnected(smtp_server):
+    _SMTPHandler.drop_after = 1
+    users = [f"user{index}@example.com" for index in range(4)]
+
+    report = _client("individual", port=smtp_server, pool_size=2).send_email(_email(users))
+
+    assert set(report.values()) == {email_client.SENT}
+    assert len(_SMTPHandler.messages) == 4
+
+
+def test_delivery_report_lists_refused_recipients(smtp_server):
+    users = ["a@example.com", "refused@example.com", "b@example.com"]
+
+    with pytest.raises(Exception, match="not delivered to 1 recipients") as error:
+        _client("individual", port=smtp_server, pool_size=1).send_email(_email(users))
+
+    assert "'refused@example.com': '550 No such user'" in str(error.value)
+    # a refused recipient is not retried over a new connection
+    assert _SMTPHandler.opened == 1
+    assert sorted(recipients[0] for recipients, _ in _SMTPHandler.messages) == ["a@example.com", "b@example.com"]
+
+
+def test_bcc_mode_reports_refused_recipients(smtp_server):
+    with pytest.raises(Exception, match="'refused@example.com': '550 No such user'"):
+        _client("bcc", port=smtp_server).send_email(_email(["a@example.com", "refused@example.com"]))
+
+    assert _SMTPHandler.messages[0][0] == ["a@example.com"]
+
+
+def test_connections_are_reused_by_warm_invocations(smtp_server):
+    users = ["a@example.com", "b@example.com"]
+    _client("individual", port=smtp_server, pool_size=1).send_email(_email(users))
+    _client("individual", port=smtp_server, pool_size=1).send_email(_email(users))
+
+    assert len(_SMTPHandler.messages) == 4
+    assert _SMTPHandler.opened == 1
@@ -0,0 +1,117 @@
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+import pytest
+
+import report_builder  # noqa: F401 registers the template filters
+import template_optimizer
+import template_registry
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+TEMPLATES = ["backend_email_template.html", "ui_email_template.html"]
+
+
+def render(template_name, optimize):
+    env = template_registry.create_environment(precompiled_dir="", optimize=optimize)
+    with open(os.path.join(GOLDEN_DIR, template_name.replace(".html", ".json"))) as f:
+        return env.get_template(template_name).render(**json.load(f))
+
+
+class VisualParser(HTMLParser):
+    """What a browser shows: tags with resolved styles and text with whitespace collapsed like CSS does."""
+    BLOCK_TAGS = re.compile(rf"^(?:{template_optimizer.BLOCK_TAGS})$")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events = []
+        self.classes = {}
+        self.verbatim = None
+        self._style = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "style":
+            self._style = ""
+        style = [rule for name in (attrs.pop("class", None) or "").split() for rule in self.classes.get(name, [])]
+        style += template_optimizer._declarations(attrs.pop("style", None) or "")
+        if "white-space: pre" in " ".join(style) or tag == "pre":
+            self.verbatim = tag
+        self.events.append(("start", tag, sorted(attrs.items()), [rule.replace(" ", "") for rule in style]))
+
+    def handle_endtag(self, tag):
+        if tag == "style":
+            inlined = template_optimizer.inline_css(f"<style>{self._style}</style>")
+            for name, body in re.findall(r"\.([\w-]+)\s*\{([^}]*)\}", self._style):
+                self.classes[name] = template_optimizer._declarations(body)
+            self.events.append(("style", template_optimizer.minify_css(inlined)))
+            self._style = None
+        if tag == self.verbatim:
+            self.verbatim = None
+        self.events.append(("end", tag))
+
+    def handle_data(self, data):
+        if self._style is not None:
+            self._style += data
+        elif self.verbatim:
+            self.events.append(("verbatim", data))
+        else:
+            self.events.append(("text", re.sub(r"\s+", " ", data)))
+
+    def visual(self):
+        merged = []
+        for event in self.events:
+            if event[0] == "text" and merged and merged[-1][0] == "text":
+                merged[-1] = ("text", merged[-1][1] + event[1])
+            else:
+                merged.append(event)
+        for index, event in enumerate(merged):
+            if event[0] != "text":
+                continue
+            text = event[1]
+            if index > 0 and self.BLOCK_TAGS.match(merged[index - 1][1]):
+                text = text.lstrip()
+            if index + 1 < len(merged) and self.BLOCK_TAGS.match(merged[index + 1][1]):
+                text = text.rstrip()
+            merged[index] = ("text", re.sub(r" +", " ", text))
+        return [event for event in merged if event != ("text", "")]
+
+
+def visual(html):
+    parser = VisualParser()
+    parser.feed(html)
+    return parser.visual()
+
+
+@pytest.mark.parametrize("template_name", TEMPLATES)
+def test_optimized_template_matches_golden_file(template_name):
+    with open(os.path.join(GOLDEN_DIR, template_name), encoding="utf-8") as f:
+        golden = f.read()
+
+    assert render(template_name, optimize=True) == golden
+
+
+@pytest.mark.parametrize("template_name", TEMPLATES)
+def test_optimized_template_renders_the_same(template_name):
+    original = render(template_name, optimize=False)
+    optimized = render(template_name, optimize=True)
+
+    assert len(optimized) < len(original)
+    assert visual(optimized) == visual(original)
+
+
+def test_inline_css_keeps_inline_declarations_last():
+    source = ('<style>* { margin: 0; } .muted { color: #999; }</style>'
+              '<span class="muted" style="color: red">{{ value }}</span>')
+
+    assert template_optimizer.inline_css(source) == (
+        '<style>*{margin: 0}</style><span style="color: #999; color: red;">{{ value }}</span>')
+
+
+def test_minify_html_keeps_jinja_and_preformatted_text():
+    source = ('<table>\n    <tr>\n        <td>  {{ "a  b" }}  </td>\n    </tr>\n</table>\n'
+              '<!-- comment --><pre>  x\n  y  </pre>\n<span>a</span> <span>b</span>')
+
+    assert template_optimizer.minify_html(source) == (
+        '<table><tr><td>{{ "a  b" }}</td></tr></table><pre>  x\n  y  </pre>\n<span>a</span> <span>b</span>')
@@ -0,0 +1,94 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import galloper_client
+from galloper_client import GalloperClient, get_galloper_client
+from resource_registry import ResourceRegistry
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    statuses = []
+    calls = []
+
+    def do_GET(self):
+        self.calls.append((self.path, self.headers.get("Authorization")))
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def galloper():
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    _Handler.statuses, _Handler.calls = [], []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_retries_on_server_errors(galloper):
+    _Handler.statuses = [503, 429]
+    client = GalloperClient(galloper, "secret", backoff=0)
+
+    assert client.get_json("/api/v1/reports?name=test") == {"path": "/api/v1/reports?name=test"}
+    assert len(_Handler.calls) == 3
+    assert all(auth == "bearer secret" for _, auth in _Handler.calls)
+    assert client.latency_summary()["calls"] == 1
+
+
+def test_get_returns_error_response_after_retries(galloper):
+    _Handler.statuses = [500, 500, 500]
+    client = GalloperClient(galloper, None, retries=2, backoff=0)
+
+    response = client.get("/api/v1/thresholds")
+
+    assert response.status_code == 500
+    assert _Handler.calls[0][1] is None
+    assert client.latency_summary(reset=True)["errors"] == 1
+    assert client.metrics == []
+
+
+def test_shared_client_per_url_and_token(monkeypatch):
+    monkeypatch.setattr(galloper_client, "registry", ResourceRegistry())
+    client = get_galloper_client("http://galloper/", "token")
+
+    assert get_galloper_client("http://galloper", "token") is client
+    assert get_galloper_client("http://galloper", "other") is not client
+
+
+def test_cached_json_fetched_once_per_invocation(galloper):
+    client = GalloperClient(galloper, "secret", backoff=0)
+    path = "/api/v1/backend_performance/thresholds/1?test=test&env=stage&order=asc"
+
+    first = client.get_json(path, cache=True)
+    first["path"] = "changed"
+    assert client.get_json(path, cache=True) == {"path": path}
+    assert client.get_json("/api/v1/other", cache=True) == {"path": "/api/v1/other"}
+    assert len(_Handler.calls) == 2
+
+    summary = client.latency_summary(reset=True)
+    assert (summary["cache_hits"], summary["cache_misses"]) == (1, 2)
+    client.get_json(path, cache=True)
+    assert len(_Handler.calls) == 3
+
+
+def test_failed_response_is_not_cached(galloper):
+    _Handler.statuses = [404]
+    client = GalloperClient(galloper, "secret", backoff=0)
+
+    with pytest.raises(Exception):
+        client.get_json("/api/v1/thresholds", cache=True)
+    assert client.get_json("/api/v1/thresholds", cache=True) == {"path": "/api/v1/thresholds"}
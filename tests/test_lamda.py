@@ -1,4 +1,13 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import lambda_function
 from lambda_function import lambda_handler, parse_args
+from resource_registry import current_batch_slot
 
 
 
@@ -164,3 +173,44 @@ def test_failed_reasons_section_outlook_rendering():
     #    - Section positioned immediately after execution summary
     # Manual test - to be executed during QA phase
     pass
+
+
+def _imported(code, modules):
+    """Modules of `modules` loaded by a fresh interpreter after running `code`"""
+    check = f"{code}; import sys; print(sorted(m for m in {modules!r} if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+
+
+def test_entry_point_imports_notification_paths_on_demand():
+    """Cold start: importing the handler does not load report generation, charts or the AI SDK"""
+    heavy = ["api_email_notification", "ui_email_notification", "numpy", "influxdb", "matplotlib", "openai",
+             "markdown"]
+    assert _imported("import lambda_function", heavy) == "[]"
+    assert _imported("import api_email_notification", ["openai", "matplotlib"]) == "[]"
+
+
+def test_batch_events_are_processed_concurrently(monkeypatch):
+    """Every event of a list is processed, at most BATCH_WORKERS at a time, each in its own registry slot"""
+    monkeypatch.setattr(lambda_function, "BATCH_WORKERS", 2)
+    running, slots, lock = [], [], threading.Lock()
+
+    def process_event(event):
+        with lock:
+            running.append(event["test"])
+            slots.append((current_batch_slot(), len(running)))
+        time.sleep(0.05)
+        with lock:
+            running.remove(event["test"])
+        if event["test"] == "broken":
+            return {'statusCode': 500, 'body': json.dumps("Some required parameters not passed")}
+        return {'statusCode': 200, 'body': json.dumps('Email has been sent')}
+    monkeypatch.setattr(lambda_function, "process_event", process_event)
+
+    response = lambda_handler([{"test": "a"}, {"test": "broken"}, {"test": "b"}, {"test": "c"}], None)
+
+    assert response['statusCode'] == 207
+    assert [(status['index'], status['statusCode']) for status in json.loads(response['body'])] == [
+        (0, 200), (1, 500), (2, 200), (3, 200)]
+    assert {slot for slot, _ in slots} == {0, 1}
+    assert max(concurrent for _, concurrent in slots) == 2
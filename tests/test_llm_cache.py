@@ -0,0 +1,103 @@
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import ai_analyzer
+from ai_analyzer import AzureOpenAIProvider
+from llm_cache import LLMCache, llm_cache_key
+from resource_registry import ResourceRegistry
+
+
+def test_key_ignores_prompt_formatting_only():
+    key = llm_cache_key("gpt-4o", 0.0, "system", "Run 1 | TPS: 10\n\nRun 2 | TPS: 12")
+
+    assert llm_cache_key("gpt-4o", 0, "system", "Run 1 | TPS: 10  \n\n\n\nRun 2 | TPS: 12\n") == key
+    assert llm_cache_key("gpt-4o", 0.0, "system", "Run 1 | TPS: 10\nRun 2 | TPS: 13") != key
+    assert llm_cache_key("gpt-4o", 0.7, "system", "Run 1 | TPS: 10\n\nRun 2 | TPS: 12") != key
+    assert llm_cache_key("gpt-4o-mini", 0.0, "system", "Run 1 | TPS: 10\n\nRun 2 | TPS: 12") != key
+    assert llm_cache_key("gpt-4o", 0.0, "trend system", "Run 1 | TPS: 10\n\nRun 2 | TPS: 12") != key
+
+
+def test_responses_survive_process_and_count_saved_tokens(tmp_path):
+    LLMCache(str(tmp_path / "cache" / "llm.sqlite3")).put("key", "analysis", tokens=1200)
+    cache = LLMCache(str(tmp_path / "cache" / "llm.sqlite3"))
+
+    assert cache.get("key") == "analysis"
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses, cache.saved_tokens) == (1, 1, 1200)
+
+
+def test_expired_and_least_recently_used_responses_are_evicted(tmp_path):
+    db_path = str(tmp_path / "llm.sqlite3")
+    cache = LLMCache(db_path, ttl=60, max_bytes=10)
+    cache.put("expired", "1234")
+    with sqlite3.connect(db_path) as db:
+        db.execute("UPDATE responses SET created = ?", (time.time() - 120,))
+    assert cache.get("expired") is None
+
+    cache.put("old", "12345")
+    cache.put("new", "67890")
+    cache.get("old")
+    cache.put("newest", "abc")
+
+    # reading "old" made it recently used, so "new" is evicted
+    assert (cache.get("old"), cache.get("new"), cache.get("newest")) == ("12345", None, "abc")
+    with sqlite3.connect(db_path) as db:
+        assert db.execute("SELECT COUNT(*) FROM responses WHERE key = 'expired'").fetchone() == (0,)
+
+
+def test_broken_store_is_a_miss(tmp_path):
+    cache = LLMCache(str(tmp_path))
+
+    cache.put("key", "analysis")
+    assert cache.get("key") is None
+
+
+class FakeCompletions(object):
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        usage = SimpleNamespace(prompt_tokens=900, completion_tokens=100, total_tokens=1000)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=" Trend is stable. "))],
+                               usage=usage)
+
+
+def _provider(monkeypatch, cache, temperature=0.0):
+    monkeypatch.setattr(ai_analyzer, "registry", ResourceRegistry())
+    monkeypatch.setattr(ai_analyzer, "AzureOpenAI",
+                        lambda **kwargs: SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions())))
+    return AzureOpenAIProvider(api_key="key", endpoint="https://openai.example.com", temperature=temperature,
+                               cache=cache)
+
+
+def test_repeated_analysis_is_served_from_cache(monkeypatch, tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"))
+    builds = [{"date": f"0{day}-Jan", "report_url": None, "throughput": 10, "error_rate": 0.1,
+               "response_time": 1.2, "total": 1000} for day in (1, 2)]
+    first = _provider(monkeypatch, cache)
+    second = _provider(monkeypatch, cache)
+
+    assert first.generate_trend_analysis(builds) == "Trend is stable."
+    assert second.generate_trend_analysis(builds) == "Trend is stable."
+    assert len(first.client.chat.completions.calls) == 1 and second.client.chat.completions.calls == []
+    assert (cache.hits, cache.saved_tokens) == (1, 1000)
+
+    other_model = _provider(monkeypatch, cache)
+    other_model.model = "gpt-4o-mini"
+    other_model.generate_trend_analysis(builds)
+    assert len(other_model.client.chat.completions.calls) == 1
+
+
+def test_sampled_analysis_is_not_cached(monkeypatch, tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"))
+    builds = [{"date": f"0{day}-Jan", "report_url": None, "throughput": 10, "error_rate": 0.1,
+               "response_time": 1.2, "total": 1000} for day in (1, 2)]
+    provider = _provider(monkeypatch, cache, temperature=0.5)
+
+    provider.generate_trend_analysis(builds)
+    provider.generate_trend_analysis(builds)
+
+    assert len(provider.client.chat.completions.calls) == 2
+    assert (cache.hits, cache.misses) == (0, 0)
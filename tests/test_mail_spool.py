@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+import email_client
+from mail_spool import MailSpool
+from test_email_client import _SMTPHandler, _client, _email, smtp_server  # noqa: F401 local SMTP stand-in
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return MailSpool(str(tmp_path / "spool"), max_attempts=3, backoff=10)
+
+
+def test_failed_recipients_are_resumed_from_the_spool(smtp_server, spool):
+    users = ["a@example.com", "refused@example.com"]
+
+    with pytest.raises(Exception, match="refused@example.com"):
+        _client("individual", port=smtp_server, pool_size=1).send_email(_email(users), spool=spool)
+
+    entry_id, = spool.entries()
+    state = spool.state(entry_id)
+    assert state["pending"] == ["refused@example.com"]
+    assert state["attempts"] == 1 and state["next_attempt"] > time.time()
+    assert spool.due() == []
+
+    # the mailbox is fixed on the relay side, a later invocation delivers the spooled message as is
+    message = spool.message(entry_id)
+    _SMTPHandler.messages.clear()
+    _SMTPHandler.refused_prefix = None
+
+    reports = _client("individual", port=smtp_server).resume(spool, now=time.time() + 10)
+
+    assert reports == {entry_id: {"refused@example.com": email_client.SENT}}
+    assert spool.entries() == []
+    assert _SMTPHandler.messages[0][0] == ["refused@example.com"]
+    assert message.split("\n", 1)[1].replace("\n", "\r\n") in _SMTPHandler.messages[0][1]
+
+
+def test_delivered_email_leaves_the_spool(smtp_server, spool):
+    _client("bcc", port=smtp_server).send_email(_email(), spool=spool)
+
+    assert spool.entries() == []
+
+
+def test_retries_back_off_and_stop_after_max_attempts(spool):
+    entry_id = spool.put("Subject: report\n\nbody", ["a@example.com"], "individual")
+    failure = {"a@example.com": "ConnectionRefusedError: refused"}
+
+    delays = []
+    for _ in range(3):
+        before = time.time()
+        state = spool.record(entry_id, failure)
+        delays.append(round(state["next_attempt"] - before))
+        assert spool.claim(entry_id)
+
+    assert delays[:2] == [10, 20]
+    assert state["status"] == "failed"
+    assert state["errors"] == failure
+    assert spool.due(now=time.time() + 3600) == []
+
+
+def test_claimed_email_is_not_delivered_twice(spool):
+    entry_id = spool.put("Subject: report\n\nbody", ["a@example.com"], "individual")
+
+    assert not spool.claim(entry_id)
+    spool.record(entry_id, {"a@example.com": "timeout"})
+    assert spool.claim(entry_id)
+
+
+def test_spooled_email_is_only_resumed_by_its_smtp_account(smtp_server, spool):
+    with pytest.raises(Exception):
+        _client("individual", port=smtp_server).send_email(_email(["refused@example.com"]), spool=spool)
+    _SMTPHandler.refused_prefix = None
+    other_tenant = email_client.EmailClient({"smtp_host": "127.0.0.1", "smtp_port": smtp_server,
+                                             "smtp_user": "other@example.com", "smtp_password": "other",
+                                             "smtp_sender": None, "email_send_mode": "individual"})
+
+    assert other_tenant.resume(spool, now=time.time() + 10) == {}
+    assert spool.due(now=time.time() + 10) == []
+    assert list(_client("individual", port=smtp_server).resume(spool, now=time.time() + 10).values()) == [
+        {"refused@example.com": email_client.SENT}]
+
+
+def test_email_is_delivered_when_spool_is_not_writable(smtp_server, spool, monkeypatch):
+    def disk_full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(spool, "put", disk_full)
+
+    report = _client("bcc", port=smtp_server).send_email(_email(["a@example.com"]), spool=spool)
+
+    assert report == {"a@example.com": email_client.SENT}
+
+
+def test_failed_emails_expire(tmp_path):
+    spool = MailSpool(str(tmp_path / "spool"), max_attempts=1, failed_ttl=60)
+    entry_id = spool.put("Subject: report\n\nbody", ["a@example.com"], "individual")
+    spool.record(entry_id, {"a@example.com": "550 No such user"})
+
+    spool.expire(now=time.time() + 30)
+    assert spool.entries() == [entry_id]
+    spool.expire(now=time.time() + 61)
+    assert spool.entries() == []
@@ -0,0 +1,32 @@
+import numpy as np
+
+from percentile_sketch import PercentileSketch
+
+
+def test_sketch_percentiles_within_relative_accuracy():
+    values = np.random.RandomState(42).lognormal(mean=6, sigma=1, size=200000).astype(int)
+    sketch = PercentileSketch(0.01)
+    for batch in np.array_split(values, 7):
+        sketch.add(batch)
+
+    assert sketch.count == values.size
+    assert sketch.min == values.min() and sketch.max == values.max()
+    assert abs(sketch.mean - values.mean()) < 1e-6 * values.mean()
+    for pct in [50, 75, 90, 95, 99]:
+        exact = np.percentile(values, pct)
+        assert abs(sketch.percentile(pct) - exact) <= 0.01 * exact + 1
+
+
+def test_merged_sketches_match_single_sketch():
+    values = np.random.RandomState(7).randint(0, 5000, size=50000)
+    single = PercentileSketch(0.02)
+    single.add(values)
+    merged = PercentileSketch(0.02)
+    for part in np.array_split(values, 4):
+        other = PercentileSketch(0.02)
+        other.add(part)
+        merged.merge(other)
+
+    assert merged.count == single.count
+    for pct in [50, 95, 99]:
+        assert merged.percentile(pct) == single.percentile(pct)
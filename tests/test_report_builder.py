@@ -0,0 +1,43 @@
+import time
+
+from report_builder import run_within_budget
+
+
+def _slow(result, seconds):
+    def call():
+        time.sleep(seconds)
+        return result
+    return call
+
+
+def test_ai_calls_run_concurrently():
+    started = time.monotonic()
+
+    results = run_within_budget({"summary": _slow("summary", 0.3), "trend": _slow("trend", 0.3)}, budget=5)
+
+    assert results == {"summary": "summary", "trend": "trend"}
+    assert time.monotonic() - started < 0.55
+
+
+def test_calls_over_budget_are_left_out():
+    started = time.monotonic()
+
+    results = run_within_budget({"summary": _slow("summary", 0.05), "trend": _slow("trend", 2)}, budget=0.3)
+
+    assert results == {"summary": "summary"}
+    assert time.monotonic() - started < 1
+
+
+def test_failed_call_does_not_drop_the_other():
+    def broken():
+        raise TimeoutError("request timed out")
+
+    assert run_within_budget({"summary": broken, "trend": _slow("trend", 0)}, budget=5) == {
+        "summary": None, "trend": "trend"}
+
+
+def test_zero_budget_runs_nothing():
+    def call():
+        raise AssertionError("AI called with a zero budget")
+
+    assert run_within_budget({"summary": call}, budget=0) == {}
@@ -0,0 +1,69 @@
+import time
+
+import data_manager
+from data_manager import DataManager
+from resource_registry import ResourceRegistry, credential_key
+
+
+class Resource(object):
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _get(registry, key, **kwargs):
+    return registry.get("client", key, Resource, check=lambda resource: resource.healthy, close=Resource.close,
+                        **kwargs)
+
+
+def test_resources_are_shared_per_credentials():
+    registry = ResourceRegistry()
+    resource = _get(registry, credential_key("http://influx", "user", "secret"))
+
+    assert _get(registry, credential_key("http://influx", "user", "secret")) is resource
+    assert _get(registry, credential_key("http://influx", "user", "other")) is not resource
+    assert "secret" not in credential_key("http://influx", "user", "secret")
+
+
+def test_idle_resources_are_health_checked():
+    registry = ResourceRegistry(check_after=0)
+    resource = _get(registry, "key")
+    resource.healthy = False
+
+    replacement = _get(registry, "key")
+
+    assert replacement is not resource and resource.closed
+    assert _get(registry, "key") is replacement
+
+
+def test_expired_resources_are_closed():
+    registry = ResourceRegistry(ttl=0.01)
+    resource = _get(registry, "key")
+    time.sleep(0.02)
+
+    registry.evict_expired()
+
+    assert resource.closed and registry.resources("client") == []
+
+
+def test_discard_and_clear_close_resources():
+    registry = ResourceRegistry()
+    first, second = _get(registry, "first"), _get(registry, "second")
+
+    registry.discard("client", "first")
+    assert first.closed and registry.resources("client") == [second]
+    registry.clear()
+    assert second.closed
+
+
+def test_data_managers_share_influx_client(monkeypatch):
+    monkeypatch.setattr(data_manager, "registry", ResourceRegistry())
+    args = {"influx_host": "localhost", "influx_port": 8086, "influx_user": "", "influx_password": ""}
+
+    client = DataManager(dict(args), None, None, None).client
+
+    assert DataManager(dict(args), None, None, None).client is client
+    assert DataManager(dict(args, influx_user="other"), None, None, None).client is not client
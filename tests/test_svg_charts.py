@@ -0,0 +1,70 @@
+import subprocess
+import sys
+import xml.etree.ElementTree as ElementTree
+
+import chart_renderer
+import svg_charts
+from report_builder import ReportBuilder
+from ui_email_notification import UIEmailNotification
+
+
+BUILDS = [{"date": f"0{index}-Jan", "error_rate": index, "throughput": 10.5 + index, "response_time": 0.5 * index}
+          for index in range(1, 4)]
+UI_BUILDS = [{"date": "01-Jan", "ttfb": 0.2, "tbt": 0.1, "lcp": 1.5, "cls": 0.01, "inp": 0.2},
+             {"date": "02-Jan", "ttfb": "No data", "tbt": 0.2, "lcp": 1.7, "cls": 0.02, "inp": "No data"}]
+LAST_TEST_DATA = [{"request_name": "home <main>", "pct95": 1200, "pct95_threshold": "green"},
+                  {"request_name": "login", "pct95": 25000, "pct95_threshold": "red"}]
+
+
+def _parse(data):
+    root = ElementTree.fromstring(data)
+    assert root.tag == "{http://www.w3.org/2000/svg}svg"
+    return root
+
+
+def test_svg_line_charts():
+    _, datapoints, _ = ReportBuilder.success_rate_chart_spec(BUILDS)
+    root = _parse(svg_charts.alerts_linechart(datapoints))
+
+    texts = [element.text for element in root.iter("{http://www.w3.org/2000/svg}text")]
+    assert {"03-Jan", "Test Runs", "Successful requests, %", "97"} <= set(texts)
+    assert len(list(root.iter("{http://www.w3.org/2000/svg}circle"))) == 3
+
+    _, datapoints, _ = UIEmailNotification.ui_metrics_chart_pages_spec(UI_BUILDS)
+    root = _parse(svg_charts.ui_metrics_chart_pages(datapoints))
+    assert len(list(root.iter("{http://www.w3.org/2000/svg}polyline"))) == 3
+
+
+def test_svg_barchart_escapes_names():
+    datapoints = {"green_keys": [1], "green_request": [1.2], "green_request_name": ["home <main>"],
+                  "yellow_keys": [], "yellow_request": [], "yellow_request_name": [],
+                  "red_keys": [2], "red_request": [-25.0], "red_request_name": ["login"],
+                  "utility_keys": [], "utility_request": [], "utility_request_name": [],
+                  "width": 8, "height": 4.5}
+    root = _parse(svg_charts.barchart(datapoints))
+
+    texts = [element.text for element in root.iter("{http://www.w3.org/2000/svg}text")]
+    assert {"home <main> ", " 1.2 s", "25.0 s ", " login"} <= set(texts)
+    fills = [element.get("fill") for element in root.iter("{http://www.w3.org/2000/svg}rect")]
+    assert fills.count("green") == 1 and fills.count("red") == 1
+
+
+def test_svg_backend_images_and_matplotlib_fallback():
+    specs = [ReportBuilder.success_rate_chart_spec(BUILDS), ("ui_comparison_linechart", {
+        "keys": [1, 2], "latency_values": [1, 2], "transfer_values": [1, 1], "tbt_values": [0, 1],
+        "ttl_values": [1, 1], "x_axis": "Test Runs", "y_axis": "Time, sec", "title": "", "width": 4, "height": 2},
+        "<comparison>")]
+
+    images = chart_renderer.chart_images(specs, backend="svg")
+
+    assert [image.get_content_type() for image in images] == ["image/svg+xml", "image/png"]
+    assert images[0]["Content-ID"] == "<success_rate>"
+
+
+def test_svg_backend_does_not_import_matplotlib():
+    code = ("import sys, lambda_function, chart_renderer\n"
+            "from report_builder import ReportBuilder\n"
+            "builds = [{'date': '01-Jan', 'error_rate': 1, 'throughput': 1, 'response_time': 1}]\n"
+            "chart_renderer.chart_images([ReportBuilder.success_rate_chart_spec(builds)], backend='svg')\n"
+            "assert 'matplotlib' not in sys.modules")
+    subprocess.run([sys.executable, "-W", "ignore", "-c", code], check=True)
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+from jinja2 import FileSystemLoader
+
+import report_builder  # noqa: F401 registers the template filters
+import template_registry
+
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    monkeypatch.setattr(template_registry, "JINJA_BYTECODE_CACHE_DIR", str(tmp_path / "bytecode"))
+    monkeypatch.setattr(template_registry, "JINJA_PRECOMPILED_DIR", str(tmp_path / "missing"))
+    monkeypatch.setattr(template_registry, "_environment", None)
+    return tmp_path
+
+
+def test_templates_compiled_once_per_process(registry):
+    template = template_registry.get_template("ui_email_template.html")
+
+    assert template_registry.get_template("ui_email_template.html") is template
+    assert template_registry.get_environment().filters["format_number"] is report_builder.format_number
+    assert os.listdir(registry / "bytecode")
+
+
+def test_precompiled_templates_are_loaded_without_sources(registry, monkeypatch):
+    template_registry.compile_templates(str(registry / "compiled"))
+
+    def no_sources(*args, **kwargs):
+        raise AssertionError("template parsed from source")
+    monkeypatch.setattr(FileSystemLoader, "get_source", no_sources)
+    env = template_registry.create_environment(precompiled_dir=str(registry / "compiled"))
+    template = env.get_template("backend_email_template.html")
+
+    assert template.name == "backend_email_template.html"
+    assert len(os.listdir(registry / "compiled")) == len(
+        [name for name in os.listdir(template_registry.TEMPLATES_DIR) if name.endswith(".html")])
+
+
+def test_precompiled_templates_are_skipped_without_optimization(registry):
+    template_registry.compile_templates(str(registry / "compiled"))
+
+    env = template_registry.create_environment(precompiled_dir=str(registry / "compiled"), optimize="false")
+    source = env.loader.get_source(env, "backend_email_template.html")[0]
+
+    assert type(env.loader) is FileSystemLoader
+    assert source == open(os.path.join(template_registry.TEMPLATES_DIR, "backend_email_template.html")).read()
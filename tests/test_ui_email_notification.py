@@ -0,0 +1,66 @@
+import threading
+import time
+
+import ui_email_notification
+from ui_email_notification import UIEmailNotification
+
+
+ARGS = {"test_id": 7, "galloper_url": "http://galloper", "token": "token", "project_id": 1, "report_id": 42,
+        "test": "ui test"}
+
+
+def _notification(monkeypatch, delay=0.1, base_id=3):
+    notification = UIEmailNotification(dict(ARGS))
+    statuses = ["Finished", "In progress", "Success", "Failed", "Finished", "Finished", "Success", "Failed"]
+    calls, threads = [], set()
+
+    def get_url(url, raw=False):
+        calls.append(url)
+        threads.add(threading.get_ident())
+        time.sleep(delay)
+        if url.startswith("/ui_performance/test/"):
+            return {"name": "ui test"}
+        if "report_id=" in url:
+            report_id = int(url.rsplit("=", 1)[1])
+            return {"id": report_id, "uid": f"uid_{report_id}", "name": "ui test", "environment": "stage"}
+        if "?name=" in url:
+            return [{"id": index, "uid": f"hist_{index}", "test_status": {"status": status}}
+                    for index, status in enumerate(statuses)]
+        if url.startswith("/ui_performance/baseline/"):
+            return {"baseline_id": base_id}
+        if url.startswith("/ui_performance/results/"):
+            return [{"type": "page", "uid": url.split("/")[4].split("?")[0]}]
+        if url.startswith("/artifacts/"):
+            return b"log"
+        raise AssertionError(url)
+
+    monkeypatch.setattr(notification, "_get_url", get_url)
+    return notification, calls, threads
+
+
+def test_fetch_reports_concurrently(monkeypatch):
+    notification, calls, threads = _notification(monkeypatch)
+
+    start = time.perf_counter()
+    fetched = notification._fetch_reports()
+    elapsed = time.perf_counter() - start
+
+    history = [future.result()[0]["uid"] for future in fetched["history"]]
+    assert history == ["hist_0", "hist_2", "hist_3", "hist_4", "hist_5"]
+    assert fetched["results_info"].result() == [{"type": "page", "uid": "uid_42"}]
+    assert fetched["base_id"] == 3 and fetched["baseline_report_info"].result()["id"] == 3
+    assert fetched["baseline_info"].result() == [{"type": "page", "uid": "3"}]
+    assert fetched["log"].result() == b"log"
+    assert "/artifacts/artifact/1/uitest/uid_42.log" in calls
+    assert len(calls) == 13 and len(threads) > 1
+    assert elapsed < 0.1 * 8
+
+
+def test_fetch_reports_without_baseline(monkeypatch):
+    monkeypatch.setattr(ui_email_notification, "UI_FETCH_WORKERS", 1)
+    notification, calls, _ = _notification(monkeypatch, delay=0, base_id=None)
+
+    fetched = notification._fetch_reports()
+
+    assert fetched["base_id"] is None and "baseline_info" not in fetched
+    assert len(fetched["history"]) == 5 and len(calls) == 11
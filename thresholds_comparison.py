@@ -1,4 +1,4 @@
-import requests
+from galloper_client import get_galloper_client
 
 
 class ThresholdsComparison:
@@ -24,16 +24,10 @@ class ThresholdsComparison:
 
     def get_thresholds_info(self):
         """Fetch thresholds from API."""
-        url = f"{self.galloper_url}/api/v1/ui_performance/thresholds/{self.project_id}?report_id={self.report_id}"
+        url = f"/api/v1/ui_performance/thresholds/{self.project_id}?report_id={self.report_id}"
         print(f"[HTTP REQUEST] {url}")
 
-        resp = requests.get(
-            url,
-            headers={
-                'Authorization': f'bearer {self.token}',
-                'Content-type': 'application/json'
-            }
-        )
+        resp = get_galloper_client(self.galloper_url, self.token).get(url)
 
         print(f"[HTTP RESPONSE] {resp.status_code} for {url}")
 
@@ -1,11 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from os import environ
 import pytz
-import requests
+from galloper_client import get_galloper_client
 import numpy as np
-from jinja2 import Environment, FileSystemLoader
-from email.mime.image import MIMEImage
+from template_registry import get_template
 
-from chart_generator import ui_metrics_chart_pages, ui_metrics_chart_actions
+from chart_renderer import chart_images
 from email_notifications import Email
 from thresholds_comparison import ThresholdsComparison
 from performance_report_generator import PerformanceReportGenerator
@@ -15,6 +16,9 @@ YELLOW = '#FFA400'
 RED = '#FF0000'
 GRAY = '#CCCCCC'
 
+# number of Galloper fetches of the UI email running concurrently, 1 - serial
+UI_FETCH_WORKERS = int(environ.get("UI_FETCH_WORKERS", 4))
+
 
 class UIEmailNotification:
     def __init__(self, arguments):
@@ -364,26 +368,62 @@ class UIEmailNotification:
             "inp_p75": calculate_percentile(inp_values)
         }
 
+    def _fetch_reports(self):
+        """
+        Issue the Galloper fetches of the UI email concurrently with a bounded pool.
+
+        Historical results are only scheduled for the first five finished reports. Futures of the
+        current results, baseline and log file are returned as is, so errors are handled where used.
+        """
+        fetched = {}
+        with ThreadPoolExecutor(max_workers=max(UI_FETCH_WORKERS, 1)) as pool:
+            info_future = pool.submit(self._get_test_info)
+            report_info_future = pool.submit(self._get_report_info)
+            fetched["info"] = info_future.result()
+            last_reports_future = pool.submit(self._get_last_report, fetched["info"]['name'], 10)
+
+            report_info = fetched["report_info"] = report_info_future.result()
+            report_uid = fetched["report_uid"] = report_info.get("uid", self.report_id)
+            fetched["results_info"] = pool.submit(self._get_results_info, report_uid)
+            fetched["baseline"] = pool.submit(self._get_baseline_report, report_info.get('name'),
+                                              report_info.get('environment'))
+            fetched["log"] = pool.submit(self._download_report_log, report_info, report_uid)
+
+            last_reports = fetched["last_reports"] = last_reports_future.result()
+            usable_reports = [each for each in last_reports
+                              if each["test_status"]["status"] in ["Finished", "Success", "Failed"]][:5]
+            fetched["history"] = [pool.submit(self._get_results_info, each["uid"]) for each in usable_reports]
+
+            try:
+                base_id = fetched["baseline"].result()["baseline_id"]
+            except Exception as e:
+                print(e)
+                base_id = None
+            fetched["base_id"] = base_id
+            if base_id:
+                fetched["baseline_report_info"] = pool.submit(
+                    self._get_url, f"/ui_performance/reports/{self.galloper_project_id}?report_id={base_id}")
+                fetched["baseline_info"] = pool.submit(self._get_results_info, base_id)
+            # waits for every scheduled fetch on exit
+        return fetched
+
     def ui_email_notification(self):
-        info = self._get_test_info()
-        last_reports = self._get_last_report(info['name'], 10)
+        fetched = self._fetch_reports()
+        info = fetched["info"]
+        last_reports = fetched["last_reports"]
 
         tests_data = []
-        for each in last_reports:
-            if each["test_status"]["status"] not in ["Finished", "Success", "Failed"] or len(tests_data) >= 5:
-                continue
-
+        for history_future in fetched["history"]:
             report = {"pages": [], "actions": []}
-            results_info = self._get_results_info(each["uid"])
-            for result in results_info:
+            for result in history_future.result():
                 report["pages" if result["type"] == "page" else "actions"].append(result)
             tests_data.append(report)
 
         page_comparison, action_comparison = self._build_comparison_data(last_reports, tests_data)
 
-        report_info = self._get_report_info()
-        report_uid = report_info.get("uid", self.report_id)
-        results_info = self._get_results_info(report_uid)
+        report_info = fetched["report_info"]
+        report_uid = fetched["report_uid"]
+        results_info = fetched["results_info"].result()
         test_environment = report_info["environment"]
 
         test_status = report_info.get("test_status", {})
@@ -425,12 +465,7 @@ class UIEmailNotification:
         )
         self._convert_result_units(results_info)
 
-        try:
-            baseline_id = self._get_baseline_report(report_info['name'], report_info['environment'])
-            base_id = baseline_id["baseline_id"]
-        except Exception as e:
-            print(e)
-            base_id = None
+        base_id = fetched["base_id"]
 
         baseline_info, baseline_test_url, baseline_test_date = [], "", ""
         baseline_comparison_pages, baseline_comparison_actions = [], []
@@ -438,9 +473,8 @@ class UIEmailNotification:
         degradation_rate = 0
 
         if base_id:
-            baseline_report_info = self._get_url(
-                f"/ui_performance/reports/{self.galloper_project_id}?report_id={base_id}")
-            baseline_info = self._get_results_info(base_id)
+            baseline_report_info = fetched["baseline_report_info"].result()
+            baseline_info = fetched["baseline_info"].result()
             baseline_test_url = f"{self.gelloper_url}/-/performance/ui/results?result_id={baseline_report_info['id']}"
             baseline_test_date = baseline_report_info['start_time']
 
@@ -553,8 +587,7 @@ class UIEmailNotification:
         # Download and parse log file from artifacts
         log_failed_transactions = []
         try:
-            bucket = report_info['name'].replace(' ', '').replace('_', '').lower()
-            log_content = self._download_log_file(bucket, report_uid)
+            log_content = fetched["log"].result()
             log_filename = f"/tmp/log_{report_info['id']}_{report_uid}.log"
             with open(log_filename, 'wb') as f:
                 f.write(log_content)
@@ -605,10 +638,10 @@ class UIEmailNotification:
             log_failed_transactions
         )
 
-        charts = [
-            self.create_ui_metrics_chart_pages(page_comparison),
-            self.create_ui_metrics_chart_actions(action_comparison)
-        ]
+        charts = chart_images([
+            self.ui_metrics_chart_pages_spec(page_comparison),
+            self.ui_metrics_chart_actions_spec(action_comparison)
+        ], backend=self.args.get('chart_backend'), profile=self.args.get('chart_profile'))
 
         return Email(self.test_name, subject, self.args['user_list'], email_body, charts, date)
 
@@ -630,6 +663,10 @@ class UIEmailNotification:
     def _download_log_file(self, bucket, report_uid):
         return self._get_url(f"/artifacts/artifact/{self.galloper_project_id}/{bucket}/{report_uid}.log", raw=True)
 
+    def _download_report_log(self, report_info, report_uid):
+        bucket = report_info['name'].replace(' ', '').replace('_', '').lower()
+        return self._download_log_file(bucket, report_uid)
+
     @staticmethod
     def _parse_log_file(log_content):
         """Parse log content and extract failed transactions with their [ERROR] messages."""
@@ -677,8 +714,7 @@ class UIEmailNotification:
                         missed_thresholds, baseline_info, aggregated_baseline,
                         failed_pages_lcp, failed_actions_inp,
                         log_failed_transactions=None):
-        env = Environment(loader=FileSystemLoader('./templates'))
-        template = env.get_template("ui_email_template.html")
+        template = get_template("ui_email_template.html")
         return template.render(
             t_params=t_params, results=results_info, page_comparison=page_comparison,
             action_comparison=action_comparison, baseline_comparison_pages=baseline_comparison_pages,
@@ -690,20 +726,13 @@ class UIEmailNotification:
         )
 
     def _get_url(self, url, raw=False):
-        full_url = f"{self.gelloper_url}/api/v1{url}"
-        resp = requests.get(
-            full_url,
-            headers={
-                'Authorization': f'bearer {self.gelloper_token}',
-                'Content-type': 'application/json'
-            }
-        )
+        resp = get_galloper_client(self.gelloper_url, self.gelloper_token).get(f"/api/v1{url}")
         if resp.status_code != 200:
             raise Exception(f"Error {resp}")
         return resp.content if raw else resp.json()
 
     @staticmethod
-    def create_ui_metrics_chart_pages(builds):
+    def ui_metrics_chart_pages_spec(builds):
         labels, x, ttfb, tbt, lcp = [], [], [], [], []
         ttfb_original, tbt_original, lcp_original = [], [], []
 
@@ -730,7 +759,6 @@ class UIEmailNotification:
             'y_axis': 'Time, sec',
             'width': 14,
             'height': 4,
-            'path_to_save': '/tmp/ui_metrics_pages.png',
             'ttfb': ttfb[::-1],
             'tbt': tbt[::-1],
             'lcp': lcp[::-1],
@@ -741,14 +769,14 @@ class UIEmailNotification:
             'labels': labels[::-1]
         }
 
-        ui_metrics_chart_pages(datapoints)
-        with open('/tmp/ui_metrics_pages.png', 'rb') as fp:
-            image = MIMEImage(fp.read())
-            image.add_header('Content-ID', '<ui_metrics_pages>')
-        return image
+        return 'ui_metrics_chart_pages', datapoints, '<ui_metrics_pages>'
 
     @staticmethod
-    def create_ui_metrics_chart_actions(builds):
+    def create_ui_metrics_chart_pages(builds):
+        return chart_images([UIEmailNotification.ui_metrics_chart_pages_spec(builds)])[0]
+
+    @staticmethod
+    def ui_metrics_chart_actions_spec(builds):
         labels, x, cls, tbt, inp = [], [], [], [], []
         cls_original, tbt_original, inp_original = [], [], []
 
@@ -775,7 +803,6 @@ class UIEmailNotification:
             'y_axis': 'Time, sec',
             'width': 14,
             'height': 4,
-            'path_to_save': '/tmp/ui_metrics_actions.png',
             'cls': cls[::-1],
             'tbt': tbt[::-1],
             'inp': inp[::-1],
@@ -786,11 +813,11 @@ class UIEmailNotification:
             'labels': labels[::-1]
         }
 
-        ui_metrics_chart_actions(datapoints)
-        with open('/tmp/ui_metrics_actions.png', 'rb') as fp:
-            image = MIMEImage(fp.read())
-            image.add_header('Content-ID', '<ui_metrics_actions>')
-        return image
+        return 'ui_metrics_chart_actions', datapoints, '<ui_metrics_actions>'
+
+    @staticmethod
+    def create_ui_metrics_chart_actions(builds):
+        return chart_images([UIEmailNotification.ui_metrics_chart_actions_spec(builds)])[0]
 
     @staticmethod
     def convert_short_date_to_cet(short_date_str, output_format='%Y-%m-%d %H:%M:%S'):